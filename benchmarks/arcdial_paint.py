@@ -0,0 +1,98 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+""" Paint cost per frame of ArcDialBase, before and after the paint caches.
+
+The "before" dial is a copy of the original paintEvent which draws the label
+and groove every frame and places the ball with QPainterPath.pointAtPercent.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/arcdial_paint.py
+
+"""
+import os
+import sys
+import time
+from math import floor
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide2.QtWidgets import QApplication
+from PySide2.QtCore import QRectF
+from PySide2.QtGui import QPainter, QPen, QPainterPath
+
+from dqtwidgets.arcdial import ArcDialBase
+
+
+class LegacyArcDial(ArcDialBase):
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        event.accept()
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing, True)
+
+        if self._label.text:
+            painter.setFont(self._label.font)
+            painter.drawText(self._label.position, self._label.text)
+
+        norm = (self._fvalue - self.fmin) / (self.fmax - self.fmin)
+        color = self._color.lighter(100 + self._hover.step * 3)
+
+        painter.setBrush(self._groove_color)
+        painter.setPen(QPen(self._groove_color, 4))
+        painter.drawArc(8.0, 8.0, 50.0, 50.0, 216*16, -252*16)
+
+        ballPath = QPainterPath()
+        ballPath.addEllipse(QRectF(14.5, 15.0, 32.0, 32.0))
+        tmp = (0.375 + 0.75 * norm)
+        ballPoint = ballPath.pointAtPercent(tmp - floor(tmp))
+
+        painter.setBrush(color)
+        painter.setPen(QPen(color, 0))
+        painter.drawEllipse(QRectF(ballPoint.x(), ballPoint.y(), 5.2, 5.2))
+
+        painter.setBrush(color)
+        painter.setPen(QPen(color, 3))
+        painter.drawArc(8.0, 8.0, 50.0, 50.0, 216 * 16, -252 * 16 * norm)
+
+        painter.restore()
+
+
+def paint_cost(cls, frames=2000):
+    """ Mean seconds per synchronous repaint while sweeping the value. """
+    dial = cls("Label", 0, 100, 0)
+    dial.show()
+    QApplication.processEvents()
+
+    start = time.perf_counter()
+    for i in range(frames):
+        dial.setValue(i % 100 + 0.5)
+        dial.repaint()
+    elapsed = time.perf_counter() - start
+
+    dial.close()
+    return elapsed / frames
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    before = paint_cost(LegacyArcDial, frames)
+    after = paint_cost(ArcDialBase, frames)
+
+    print(f"before: {before * 1e6:8.1f} us/frame")
+    print(f"after:  {after * 1e6:8.1f} us/frame")
+    print(f"speedup: {before / after:.2f}x")
@@ -0,0 +1,95 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+""" Helpers shared by the headless benchmarks. """
+import gc
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import PySide2
+from PySide2.QtCore import qVersion
+from PySide2.QtWidgets import QApplication
+
+
+def application():
+    return QApplication.instance() or QApplication(sys.argv)
+
+
+def timed(fn, repeat=1):
+    """ Best wall time in seconds of `repeat` calls of fn. """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def rss_bytes():
+    """ Resident set size of this process. """
+    gc.collect()
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        # Peak instead of current RSS, still useful for growth between runs
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def memory_per_instance(factory, count):
+    """ Resident memory growth per instance while `count` instances are alive. """
+    before = rss_bytes()
+    instances = [factory() for _ in range(count)]
+    after = rss_bytes()
+    del instances
+    gc.collect()
+    return (after - before) / count
+
+
+def paint_time(widget, frames):
+    """ Mean seconds per synchronous repaint of a shown widget. """
+    widget.window().show()
+    QApplication.processEvents()
+    elapsed = timed(lambda: [widget.repaint() for _ in range(frames)])
+    return elapsed / frames
+
+
+class Results:
+    """ Flat list of measurements, written out as JSON. """
+    def __init__(self):
+        self.records = []
+
+    def add(self, widget, metric, value, unit, **params):
+        self.records.append(dict(widget=widget, metric=metric, value=value, unit=unit, params=params))
+        details = " ".join(f"{k}={v}" for k, v in params.items())
+        print(f"{widget:<14} {metric:<12} {value:>14.6g} {unit:<6} {details}", flush=True)
+
+    def meta(self):
+        return dict(python=platform.python_version(),
+                    pyside2=PySide2.__version__,
+                    qt=qVersion(),
+                    platform=platform.platform(),
+                    qpa=os.environ.get("QT_QPA_PLATFORM"),
+                    timestamp=time.strftime("%Y-%m-%dT%H:%M:%S%z"))
+
+    def dump(self, f):
+        import json
+        json.dump(dict(meta=self.meta(), results=self.records), f, indent=2)
@@ -0,0 +1,457 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+""" Headless benchmarks for every dqtwidgets widget.
+
+Measures construction time, paint time at several sizes, the cost of bursts
+of value updates and resident memory per instance. Results are printed and
+written as JSON for tracking regressions between runs.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --quick --only ArcDial CrossHair
+
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from common import application, timed, memory_per_instance, paint_time, Results
+
+from PySide2.QtWidgets import QApplication, QTreeWidgetItem
+from PySide2.QtCore import Qt, QTimer, QModelIndex
+
+from dqtwidgets.editable import apply_changes
+from dqtwidgets import (ArcDial, ArcDialBank, CrossHair, Coordinate, Bounds, EditableTree, EditableTreeView,
+                        EditableList, EditableListView, PinSelector, ScalableImage, ArrowKeys, KeyboardShortCuts, FatButton,
+                        SearchFilter, EditHistory)
+
+
+IMAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dqtwidgets", "images")
+PAINT_SIZES = [(100, 100), (400, 300), (1200, 800)]
+FRAMES = 200
+BURST = 10000
+
+
+def bench_arcdial(results, quick):
+    results.add("ArcDial", "memory", memory_per_instance(lambda: ArcDial("x"), 200), "B")
+    results.add("ArcDial", "construct", timed(lambda: [ArcDial("x") for _ in range(100)]) / 100, "s")
+
+    widget = ArcDial("x", 0, 100)
+    results.add("ArcDial", "paint", paint_time(widget.dial, FRAMES), "s",
+                width=widget.dial.width(), height=widget.dial.height())
+
+    dial = widget.dial
+    burst = timed(lambda: [dial.setValue(i % 100 + 0.5, True) for i in range(BURST)])
+    results.add("ArcDial", "updates", burst / BURST, "s", n=BURST)
+
+
+def bench_arcdialbank(results, quick):
+    for count in [64, 256] if quick else [64, 256, 1024]:
+        results.add("ArcDialBank", "construct", timed(lambda: ArcDialBank(count, columns=16)), "s", dials=count)
+        bank = ArcDialBank(count, columns=16)
+        results.add("ArcDialBank", "paint", paint_time(bank, FRAMES // 10), "s", dials=count,
+                    width=bank.width(), height=bank.height())
+        burst = timed(lambda: [bank.setValue(i % count, i % 10, True) for i in range(BURST)])
+        results.add("ArcDialBank", "updates", burst / BURST, "s", dials=count, n=BURST)
+        bank.close()
+
+
+def crosshair(width=180, height=100):
+    return CrossHair(coordinate=Coordinate(2.5, 2.5),
+                     bounds=Bounds(Coordinate(-5, -5), Coordinate(5, 5)),
+                     width=width, height=height)
+
+
+def bench_crosshair(results, quick):
+    results.add("CrossHair", "memory", memory_per_instance(crosshair, 200), "B")
+    results.add("CrossHair", "construct", timed(lambda: [crosshair() for _ in range(100)]) / 100, "s")
+
+    for width, height in PAINT_SIZES:
+        widget = crosshair(width, height)
+        results.add("CrossHair", "paint", paint_time(widget, FRAMES), "s", width=width, height=height)
+        widget.close()
+
+    widget = crosshair()
+    coordinates = [Coordinate((i % 100) / 10 - 5, (i % 37) / 3.7 - 5) for i in range(BURST)]
+    burst = timed(lambda: [widget.setCoordinate(c) for c in coordinates])
+    results.add("CrossHair", "updates", burst / BURST, "s", n=BURST)
+
+    rng = np.random.default_rng(0)
+    for count in [10_000, 100_000] if quick else [10_000, 100_000, 1_000_000]:
+        widget = crosshair(400, 300)
+        widget.setPoints(rng.uniform(-5, 5, (count, 2)))
+        widget.setTrailLength(count)
+        widget.trail().extend(np.cumsum(rng.normal(0, 0.01, (count, 3)), axis=0))
+        paint_time(widget, 1)
+        for zoom in [1, 10, 1000]:
+            frames = [zoom * (1 + i / FRAMES) for i in range(FRAMES // 10)]
+            elapsed = timed(lambda: [(widget.setZoom(z), widget.repaint()) for z in frames])
+            results.add("CrossHair", "zoom", elapsed / len(frames), "s", points=count, zoom=zoom)
+
+        # A new sample and a moved target every frame
+        widget.setZoom(1)
+        samples = [Coordinate(*xyz) for xyz in rng.uniform(-5, 5, (FRAMES // 10, 3)).tolist()]
+        moves = rng.uniform(-5, 5, (len(samples), 2)).tolist()
+        elapsed = timed(lambda: [(widget.appendSample(c), widget.points().move(i, x, y), widget.repaint())
+                                 for i, (c, (x, y)) in enumerate(zip(samples, moves))])
+        results.add("CrossHair", "stream", elapsed / len(samples), "s", points=count)
+        widget.close()
+
+
+def item_counts(quick):
+    return [10_000, 100_000] if quick else [10_000, 100_000, 1_000_000]
+
+
+def chunked_fill(results, name, factory, count):
+    """ Fill a shown list from a generator, timing the fill and the longest event loop stall. """
+    widget = factory()
+    widget.resize(400, 600)
+    widget.show()
+    QApplication.processEvents()
+
+    ticks = []
+    timer = QTimer()
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    timer.start(0)
+
+    start = time.perf_counter()
+    widget.populate((f"channel {i}" for i in range(count)), chunked=True)
+    while widget.isPopulating():
+        QApplication.processEvents()
+    elapsed = time.perf_counter() - start
+    timer.stop()
+
+    results.add(name, "chunked", elapsed, "s", items=count)
+    results.add(name, "stall", float(np.diff([start] + ticks).max()), "s", items=count)
+    widget.close()
+
+
+def drag_drop(results, name, source, target, n):
+    """ Encode the first n rows of source for a drag and drop them on target. """
+    model = source.model()
+    indexes = [model.index(row, 0) for row in range(min(n, model.rowCount()))]
+
+    def move():
+        target.model().dropMimeData(model.mimeData(indexes), Qt.MoveAction, 0, 0, QModelIndex())
+    results.add(name, "drag", timed(move), "s", items=model.rowCount(), n=len(indexes), target=type(target).__name__)
+
+
+def search(results, name, widget, count, pattern):
+    """ Type pattern into a SearchFilter one key per frame, timing until all rows are shown or hidden. """
+    search = SearchFilter(widget)
+    ticks = []
+    timer = QTimer()
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    timer.start(0)
+
+    start = time.perf_counter()
+    for i in range(1, len(pattern) + 1):
+        search.setPattern(pattern[:i])
+        QApplication.processEvents()
+    while search.isBusy():
+        QApplication.processEvents()
+    elapsed = time.perf_counter() - start
+    timer.stop()
+
+    results.add(name, "filter", elapsed, "s", items=count, pattern=pattern)
+    results.add(name, "filter stall", float(np.diff([start] + ticks).max()), "s", items=count, pattern=pattern)
+    search.setPattern("")
+    while search.isBusy():
+        QApplication.processEvents()
+    search.close()
+
+
+def undo_redo(results, name, widget, count, n=BURST):
+    """ Attach an EditHistory, remove the first n rows and undo and redo that. """
+    holder = []
+    results.add(name, "history", timed(lambda: holder.append(EditHistory(widget))), "s", items=count)
+    history = holder.pop()
+
+    model = widget.model()
+    n = min(n, model.rowCount())
+    model.removeRows(0, n)
+    history.seal()
+    results.add(name, "history memory", history.memory(), "B", items=count, n=n)
+    results.add(name, "undo", timed(history.undo), "s", items=count, n=n)
+    results.add(name, "redo", timed(history.redo), "s", items=count, n=n)
+    history.undo()
+    history.deleteLater()
+
+
+def bench_editablelist(results, quick):
+    for count in item_counts(quick):
+        names = [f"channel {i}" for i in range(count)]
+        results.add("EditableList", "memory",
+                    memory_per_instance(lambda: EditableList(names), 1) / count, "B/item", items=count)
+
+        holder = []
+        results.add("EditableList", "construct", timed(lambda: holder.append(EditableList(names))), "s", items=count)
+        widget = holder.pop()
+
+        results.add("EditableList", "items", timed(lambda: widget.items), "s", items=count)
+        widget.resize(400, 600)
+        results.add("EditableList", "paint", paint_time(widget.viewport(), FRAMES // 10), "s", items=count,
+                    width=400, height=600)
+
+        n = min(BURST, count)
+        version, mirror = widget.version, list(widget.items)
+        burst = timed(lambda: [widget.item(i).setText(f"renamed {i}") for i in range(n)])
+        results.add("EditableList", "updates", burst / n, "s", items=count, n=n)
+        results.add("EditableList", "sync", timed(lambda: apply_changes(mirror, widget.changes_since(version))), "s",
+                    items=count, n=n)
+        undo_redo(results, "EditableList", widget, count)
+        search(results, "EditableList", widget, count, "channel 12")
+        drag_drop(results, "EditableList", widget, EditableTree(), BURST)
+
+        widget.close()
+        chunked_fill(results, "EditableList", EditableList, count)
+
+
+def bench_editablelistview(results, quick):
+    for count in item_counts(quick):
+        names = [f"channel {i}" for i in range(count)]
+        results.add("EditableListView", "memory",
+                    memory_per_instance(lambda: EditableListView(names), 1) / count, "B/item", items=count)
+
+        holder = []
+        results.add("EditableListView", "construct", timed(lambda: holder.append(EditableListView(names))), "s",
+                    items=count)
+        widget = holder.pop()
+
+        results.add("EditableListView", "items", timed(lambda: widget.items), "s", items=count)
+        widget.resize(400, 600)
+        results.add("EditableListView", "paint", paint_time(widget.viewport(), FRAMES // 10), "s", items=count,
+                    width=400, height=600)
+
+        model = widget.model()
+        n = min(BURST, count)
+        version, mirror = widget.version, list(widget.items)
+        burst = timed(lambda: [model.setData(model.index(i), f"renamed {i}") for i in range(n)])
+        results.add("EditableListView", "updates", burst / n, "s", items=count, n=n)
+        results.add("EditableListView", "sync", timed(lambda: apply_changes(mirror, widget.changes_since(version))),
+                    "s", items=count, n=n)
+        undo_redo(results, "EditableListView", widget, count)
+        search(results, "EditableListView", widget, count, "channel 12")
+        drag_drop(results, "EditableListView", widget, EditableTreeView(), BURST)
+
+        widget.close()
+        chunked_fill(results, "EditableListView", EditableListView, count)
+
+
+def populate_tree(tree, count, fanout=10):
+    """ Add `count` nodes as top level entries with `fanout` children each. """
+    top = []
+    for i in range(count // (fanout + 1)):
+        parent = QTreeWidgetItem([f"node {i}"])
+        parent.addChildren([QTreeWidgetItem([f"leaf {i}.{j}"]) for j in range(fanout)])
+        top.append(parent)
+    tree.addTopLevelItems(top)
+    return tree
+
+
+def bench_editabletree(results, quick):
+    for count in item_counts(quick):
+        results.add("EditableTree", "memory",
+                    memory_per_instance(lambda: populate_tree(EditableTree(), count), 1) / count, "B/item",
+                    items=count)
+
+        holder = []
+        results.add("EditableTree", "construct", timed(lambda: holder.append(populate_tree(EditableTree(), count))),
+                    "s", items=count)
+        widget = holder.pop()
+
+        results.add("EditableTree", "items", timed(lambda: widget.items), "s", items=count)
+        widget.resize(400, 600)
+        widget.expandAll()
+        results.add("EditableTree", "paint", paint_time(widget.viewport(), FRAMES // 10), "s", items=count,
+                    width=400, height=600)
+        tree_latency(results, "EditableTree", widget, count)
+        undo_redo(results, "EditableTree", widget, count)
+        search(results, "EditableTree", widget, count, "leaf 12")
+        drag_drop(results, "EditableTree", widget, EditableList(), BURST)
+
+        top = [widget.topLevelItem(i) for i in range(min(BURST, widget.topLevelItemCount()))]
+        burst = timed(lambda: [item.setText(0, "renamed") for item in top])
+        results.add("EditableTree", "updates", burst / len(top), "s", items=count, n=len(top))
+
+        widget.close()
+
+
+def tree_latency(results, name, widget, count, n=50):
+    """ Time to expand or scroll to a node and repaint, on a shown tree. """
+    model = widget.model()
+    top = [model.index(i * (model.rowCount() // n), 0) for i in range(n)]
+    widget.collapseAll()
+    paint_time(widget.viewport(), 1)
+
+    def expand():
+        for index in top:
+            widget.expand(index)
+            widget.viewport().repaint()
+    results.add(name, "expand", timed(expand) / n, "s", items=count)
+
+    bar = widget.verticalScrollBar()
+    positions = [bar.maximum() * i // n for i in range(n)][::-1]
+
+    def scroll():
+        for position in positions:
+            bar.setValue(position)
+            widget.viewport().repaint()
+    results.add(name, "scroll", timed(scroll) / n, "s", items=count)
+
+
+def populate_view(view, count, fanout=10):
+    """ Same shape as populate_tree, created in the store directly. """
+    model = view.model()
+    model.beginResetModel()
+    model.store.populate(0, {f"node {i}": {f"leaf {i}.{j}": {} for j in range(fanout)}
+                             for i in range(count // (fanout + 1))})
+    for id in list(model.store.pending):
+        model.store.fetch(id)
+    model.endResetModel()
+    return view
+
+
+def bench_editabletreeview(results, quick):
+    for count in item_counts(quick):
+        results.add("EditableTreeView", "memory",
+                    memory_per_instance(lambda: populate_view(EditableTreeView(), count), 1) / count, "B/item",
+                    items=count)
+
+        holder = []
+        results.add("EditableTreeView", "construct",
+                    timed(lambda: holder.append(populate_view(EditableTreeView(), count))), "s", items=count)
+        widget = holder.pop()
+
+        results.add("EditableTreeView", "items", timed(lambda: widget.items), "s", items=count)
+        widget.resize(400, 600)
+        widget.expandAll()
+        results.add("EditableTreeView", "paint", paint_time(widget.viewport(), FRAMES // 10), "s", items=count,
+                    width=400, height=600)
+        tree_latency(results, "EditableTreeView", widget, count)
+        undo_redo(results, "EditableTreeView", widget, count)
+        search(results, "EditableTreeView", widget, count, "leaf 12")
+        drag_drop(results, "EditableTreeView", widget, EditableListView(), BURST)
+
+        model = widget.model()
+        top = [model.index(i, 0) for i in range(min(BURST, model.rowCount()))]
+        burst = timed(lambda: [model.setData(index, "renamed") for index in top])
+        results.add("EditableTreeView", "updates", burst / len(top), "s", items=count, n=len(top))
+
+        widget.close()
+
+
+def bench_pinselector(results, quick):
+    for pins in [1_000, 10_000] if quick else [1_000, 10_000, 100_000]:
+        results.add("PinSelector", "memory", memory_per_instance(lambda: PinSelector(32, pins), 1) / pins,
+                    "B/pin", pins=pins)
+
+        holder = []
+        results.add("PinSelector", "construct", timed(lambda: holder.append(PinSelector(32, pins))), "s", pins=pins)
+        widget = holder.pop()
+        widget.resize(widget.minimumWidth(), 600)
+        results.add("PinSelector", "paint", paint_time(widget.viewport(), FRAMES // 10), "s", pins=pins,
+                    width=widget.width(), height=600)
+
+        n = min(BURST, widget.rowCount() * 32)
+        burst = timed(lambda: [widget.item(i // 32, i % 32).setText("x") for i in range(n)])
+        results.add("PinSelector", "updates", burst / n, "s", pins=pins, n=n)
+
+        widget.close()
+
+
+def bench_scalableimage(results, quick):
+    path = os.path.join(IMAGES, "placeholder-image.png")
+    results.add("ScalableImage", "memory", memory_per_instance(lambda: ScalableImage(path), 100), "B")
+    results.add("ScalableImage", "construct", timed(lambda: [ScalableImage(path) for _ in range(100)]) / 100, "s")
+
+    for width, height in PAINT_SIZES:
+        widget = ScalableImage(path, max_height=height)
+        widget.resize(width, height)
+        results.add("ScalableImage", "paint", paint_time(widget, FRAMES // 10), "s", width=width, height=height)
+        widget.close()
+
+    widget = ScalableImage(path)
+    n = BURST // 10
+    burst = timed(lambda: [widget.resize(100 + i % 300, 100 + i % 200) for i in range(n)])
+    results.add("ScalableImage", "updates", burst / n, "s", n=n)
+
+
+def arrowkeys():
+    return ArrowKeys("controls", KeyboardShortCuts(left="A", right="D", forward="W", back="S", up="R", down="F"))
+
+
+def bench_arrowkeys(results, quick):
+    results.add("ArrowKeys", "memory", memory_per_instance(arrowkeys, 100), "B")
+    results.add("ArrowKeys", "construct", timed(lambda: [arrowkeys() for _ in range(100)]) / 100, "s")
+
+    widget = arrowkeys()
+    results.add("ArrowKeys", "paint", paint_time(widget, FRAMES), "s", width=widget.width(), height=widget.height())
+
+    states = [widget.led.moving, widget.led.active, widget.led.warning]
+    burst = timed(lambda: [states[i % 3]() for i in range(BURST)])
+    results.add("ArrowKeys", "updates", burst / BURST, "s", n=BURST)
+
+
+def fatbutton():
+    return FatButton("Press me!", os.path.join(IMAGES, "letter.png"))
+
+
+def bench_fatbutton(results, quick):
+    results.add("FatButton", "memory", memory_per_instance(fatbutton, 100), "B")
+    results.add("FatButton", "construct", timed(lambda: [fatbutton() for _ in range(100)]) / 100, "s")
+
+    widget = fatbutton()
+    results.add("FatButton", "paint", paint_time(widget, FRAMES), "s", width=widget.width(), height=widget.height())
+
+    burst = timed(lambda: [widget.setChecked(i % 2 == 0) for i in range(BURST)])
+    results.add("FatButton", "updates", burst / BURST, "s", n=BURST)
+
+
+BENCHMARKS = {
+    "ArcDial": bench_arcdial,
+    "ArcDialBank": bench_arcdialbank,
+    "CrossHair": bench_crosshair,
+    "EditableList": bench_editablelist,
+    "EditableListView": bench_editablelistview,
+    "EditableTree": bench_editabletree,
+    "EditableTreeView": bench_editabletreeview,
+    "PinSelector": bench_pinselector,
+    "ScalableImage": bench_scalableimage,
+    "ArrowKeys": bench_arrowkeys,
+    "FatButton": bench_fatbutton,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0].strip())
+    parser.add_argument("--output", "-o", help="write JSON results to this file")
+    parser.add_argument("--quick", action="store_true", help="skip the largest sizes")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run only these widgets")
+    args = parser.parse_args()
+
+    app = application()
+    results = Results()
+    for name in args.only or BENCHMARKS:
+        BENCHMARKS[name](results, args.quick)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            results.dump(f)
+    else:
+        results.dump(sys.stdout)
@@ -1,11 +1,19 @@
-from .arcdial import ArcDial
+from .arcdial import ArcDial, ArcDialGroup
+from .arcdialbank import ArcDialBank
+from .feed import ValueFeed, ChunkedFeed
 from .layouts import h_layout, v_layout, add_widgets
 from .pinselector import PinSelector
 from .templatemain import MainWindowTemplate
-from .crosshair import CrossHair, Coordinate, Bounds
+from .crosshair import CrossHair, Coordinate, CoordinateArray, Bounds, BoundsCheck
 from .wasd import ArrowKeys, SYMBOLS, KeyboardShortCuts, QLED
 from .gbox import group_box
 from .editable import EditableTree, EditableList, add_action
+from .treemodel import TreeModel, EditableTreeView
+from .listmodel import ListModel, EditableListView
 from .theme import THEME
 from .image import ScalableImage
+from .spatial import PointSet, GridIndex, DensityPyramid
+from .search import TrigramIndex, SearchFilter
+from .history import EditHistory
 from .fatbutton import FatButton
+from .instrument import instrument, uninstrument, InstrumentOverlay
@@ -0,0 +1,117 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+from PySide2.QtCore import Qt, QObject, QTimer
+
+
+FRAME_INTERVAL = 16
+
+
+class AnimationDriver(QObject):
+    """ Process wide frame clock for widget animations.
+
+    Widgets register a step function which is called once per frame until it
+    returns False. After all steps of a frame ran, every stepped widget gets a
+    single update() call. One-off work can be deferred to the next frame with
+    schedule(), repeated schedules under the same key run only once.
+    Callbacks added with subscribe() run every frame until unsubscribed. The
+    timer only runs while something is registered.
+
+    >>> animation_driver().animate(widget, step)
+    >>> animation_driver().schedule(key, callback)
+    >>> animation_driver().subscribe(key, callback)
+
+    """
+    def __init__(self, interval=FRAME_INTERVAL):
+        super().__init__()
+        self._animations = {}
+        self._scheduled = {}
+        self._subscribers = {}
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._tick)
+
+    def animate(self, widget, step):
+        self._animations[widget] = step
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def schedule(self, key, callback):
+        self._scheduled[key] = callback
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def subscribe(self, key, callback):
+        self._subscribers[key] = callback
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def unsubscribe(self, key):
+        self._subscribers.pop(key, None)
+        self._stopIfIdle()
+
+    def stop(self, widget):
+        self._animations.pop(widget, None)
+        self._stopIfIdle()
+
+    def _stopIfIdle(self):
+        if not (self._animations or self._scheduled or self._subscribers):
+            self._timer.stop()
+
+    def isAnimating(self, widget):
+        return widget in self._animations
+
+    def isActive(self):
+        return self._timer.isActive()
+
+    def _tick(self):
+        scheduled, self._scheduled = self._scheduled, {}
+        for callback in list(scheduled.values()) + list(self._subscribers.values()):
+            try:
+                callback()
+            except RuntimeError:
+                pass
+
+        stepped = []
+        for widget, step in list(self._animations.items()):
+            try:
+                running = step()
+            except RuntimeError:
+                # The C++ side of the widget is already gone
+                running = False
+            else:
+                stepped.append(widget)
+
+            if not running:
+                del self._animations[widget]
+
+        for widget in stepped:
+            try:
+                widget.update()
+            except RuntimeError:
+                pass
+
+        self._stopIfIdle()
+
+
+_driver = None
+
+
+def animation_driver():
+    global _driver
+    if _driver is None:
+        _driver = AnimationDriver()
+    return _driver
@@ -15,18 +15,48 @@
 #
 from PySide2.QtWidgets import QDial, QLineEdit, QWidget
 from PySide2.QtCore import Qt, Signal, Slot, QPointF, QRectF, QTimer
-from PySide2.QtGui import QColor, QFont, QFontMetrics, QPainter, QPen, QPainterPath, QCursor, QDoubleValidator, QIntValidator
-from math import floor
+from PySide2.QtGui import QColor, QFont, QFontMetrics, QPainter, QPen, QPixmap, QCursor, QDoubleValidator, QIntValidator
+from math import ceil, cos, sin, pi
+from time import monotonic
 from types import SimpleNamespace as box
+import numpy as np
 from dqtwidgets.layouts import v_layout
+from dqtwidgets.animation import animation_driver
+from dqtwidgets.instrument import Instrumented
 
 
-class ArcDialBase(QDial):
+def dial_geometry(size):
+    """ Arc and indicator ball placement for a dial of `size` pixels.
+
+    The layout was designed for a 64 pixel dial, other sizes are scaled.
+
+    """
+    s = size / 64
+    return box(arc=QRectF(8.0 * s, 8.0 * s, 50.0 * s, 50.0 * s),
+               center=QPointF(30.5 * s, 31.0 * s),
+               radius=16.0 * s,
+               ball=5.2 * s)
+
+
+def ball_position(geometry, norm):
+    """ Top left corner of the indicator ball for a normalized value.
+
+    The ball runs clockwise over 270 degrees of the circle starting at the
+    bottom left, i.e. the same track as the value arc.
+
+    """
+    angle = 2 * pi * (0.375 + 0.75 * norm)
+    return (geometry.center.x() + geometry.radius * cos(angle),
+            geometry.center.y() + geometry.radius * sin(angle))
+
+
+class ArcDialBase(Instrumented, QDial):
 
     fvalueChanged = Signal(float)
     dragStateChanged = Signal(bool)
 
-    def __init__(self, label="", start=0, stop=10, initial=0, color="#3eb8be", groove_color="#c0c0c0"):
+    def __init__(self, label="", start=0, stop=10, initial=0, color="#3eb8be", groove_color="#c0c0c0",
+                 max_rate=None, min_delta=None):
         super().__init__()
         self.setRange(start, stop)
         self.setCursor(QCursor(Qt.SizeHorCursor))
@@ -47,6 +77,13 @@ class ArcDialBase(QDial):
         self._hover = box(active=False, min=0, max=9, step=0)
         self._label = box(text=label, width=0, height=0, position=QPointF(0, 0), font=QFont(self.font()))
         self._label.font.setPixelSize(10)
+        self._cache = box(key=None, pixmap=None)
+
+        # Optional rate limiting of fvalueChanged while dragging
+        self._throttle = box(interval=1 / max_rate if max_rate else 0, delta=min_delta or 0,
+                             emitted=self._fvalue, time=0, timer=QTimer(self))
+        self._throttle.timer.setSingleShot(True)
+        self._throttle.timer.timeout.connect(self._emitThrottled)
 
         self.updateSizes()
 
@@ -66,22 +103,21 @@ class ArcDialBase(QDial):
             return
 
         if value <= self.fmin:
-            qval = 0
-            self._fvalue = self.fmin
+            self._applyValue(self.fmin, 0)
         elif value >= self.fmax:
-            qval = self.fprecision
-            self._fvalue = self.fmax
+            self._applyValue(self.fmax, self.fprecision)
         else:
-            qval = round((value - self.fmin) / (self.fmax - self.fmin) * self.fprecision)
-            self._fvalue = value
+            self._applyValue(value, round((value - self.fmin) / (self.fmax - self.fmin) * self.fprecision))
+
+        if emitSignal:
+            self.fvalueChanged.emit(self._fvalue)
 
+    def _applyValue(self, fvalue, qval):
+        self._fvalue = fvalue
         self.blockSignals(True)
         QDial.setValue(self, qval)
         self.blockSignals(False)
 
-        if emitSignal:
-            self.fvalueChanged.emit(self._fvalue)
-
     def setLabel(self, label):
         if self._label.text == label:
             return
@@ -90,11 +126,22 @@ class ArcDialBase(QDial):
         self.updateSizes()
         self.update()
 
+    def setColor(self, color):
+        self._color = QColor(color)
+        self._cache.key = None
+        self.update()
+
+    def setGrooveColor(self, color):
+        self._groove_color = QColor(color)
+        self._cache.key = None
+        self.update()
+
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
             self._isPressed = True
             self._lastDragPos = event.pos()
             self._lastDragValue = self._fvalue
+            self._throttle.emitted = self._fvalue
             self.dragStateChanged.emit(True)
 
     def mouseMoveEvent(self, event):
@@ -112,68 +159,102 @@ class ArcDialBase(QDial):
         elif value > self.fmax:
             value = self.fmax
 
-        self.setValue(value, True)
+        self.setValue(value)
+        self._emitThrottled()
 
     def mouseReleaseEvent(self, _):
         if self._isPressed:
             self._isPressed = False
+            # Whatever the throttle held back is delivered before the drag ends
+            if self._throttle.emitted != self._fvalue:
+                self._emitValue()
+            self._throttle.timer.stop()
             self.dragStateChanged.emit(False)
 
+    def _emitThrottled(self):
+        t = self._throttle
+        if t.emitted == self._fvalue:
+            return
+
+        if abs(self._fvalue - t.emitted) < t.delta:
+            return
+
+        wait = t.interval - (monotonic() - t.time)
+        if wait > 0:
+            # Deliver the latest value once the interval has passed
+            if not t.timer.isActive():
+                t.timer.start(ceil(wait * 1000))
+            return
+
+        self._emitValue()
+
+    def _emitValue(self):
+        self._throttle.emitted = self._fvalue
+        self._throttle.time = monotonic()
+        self.fvalueChanged.emit(self._fvalue)
+
     def paintEvent(self, event):
         painter = QPainter(self)
         event.accept()
 
+        # Label and groove only change with size, colors or text
+        painter.drawPixmap(0, 0, self._staticLayers())
+
         painter.save()
         painter.setRenderHint(QPainter.Antialiasing, True)
 
-        if self._label.text:
-            painter.setFont(self._label.font)
-            painter.drawText(self._label.position, self._label.text)
-
-        h = self._size.height
+        geometry = self._geometry
         norm = (self._fvalue - self.fmin) / (self.fmax - self.fmin)
-        target = QRectF(0, 0, h, h)
-        source = QRectF(h, 0, h, h)
-
         color = self._color.lighter(100 + self._hover.step * 3)
 
-        # Background
-        painter.setBrush(self._groove_color)
-        painter.setPen(QPen(self._groove_color, 4))
-        painter.drawArc(8.0, 8.0, 50.0, 50.0, 216*16, -252*16)
-
         # draw small circle
-        ballRect = QRectF(14.5, 15.0, 32.0, 32.0)
-        ballPath = QPainterPath()
-        ballPath.addEllipse(ballRect)
-        tmp = (0.375 + 0.75 * norm)
-        ballValue = tmp - floor(tmp)
-        ballPoint = ballPath.pointAtPercent(ballValue)
-
-        # draw arc
-        startAngle = 216 * 16
-        spanAngle = -252 * 16 * norm
-
+        x, y = ball_position(geometry, norm)
         painter.setBrush(color)
         painter.setPen(QPen(color, 0))
-        painter.drawEllipse(QRectF(ballPoint.x(), ballPoint.y(), 5.2, 5.2))
+        painter.drawEllipse(QRectF(x, y, geometry.ball, geometry.ball))
 
-        painter.setBrush(color)
+        # draw arc
         painter.setPen(QPen(color, 3))
+        painter.drawArc(geometry.arc, 216 * 16, -252 * 16 * norm)
 
-        painter.drawArc(8.0, 8.0, 50.0, 50.0, startAngle, spanAngle)
+        painter.restore()
 
-        if self._hover.min < self._hover.step < self._hover.max:
-            self._hover.step += 1 if self._hover.active else -1
-            QTimer.singleShot(20, self.update)
+    def _staticLayers(self):
+        ratio = self.devicePixelRatioF()
+        text_color = self.palette().color(self.foregroundRole())
+        key = (self.width(), self.height(), ratio, self._groove_color.rgba(), text_color.rgba(), self._label.text)
+        if self._cache.key == key:
+            return self._cache.pixmap
 
-        painter.restore()
+        pixmap = QPixmap(round(self.width() * ratio), round(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+
+        if self._label.text:
+            painter.setPen(text_color)
+            painter.setFont(self._label.font)
+            painter.drawText(self._label.position, self._label.text)
+
+        # Background
+        painter.setBrush(self._groove_color)
+        painter.setPen(QPen(self._groove_color, 4))
+        painter.drawArc(self._geometry.arc, 216*16, -252*16)
+        painter.end()
+
+        self._cache.key = key
+        self._cache.pixmap = pixmap
+        return pixmap
 
     def resizeEvent(self, event):
         QDial.resizeEvent(self, event)
         self.updateSizes()
 
     def updateSizes(self):
+        self._cache.key = None
+        self._geometry = dial_geometry(self._size.height)
         s = (self._size.height, self._size.height + self._label.height + self._size.spacer)
         self.setMinimumSize(*s)
         self.setMaximumSize(*s)
@@ -193,21 +274,71 @@ class ArcDialBase(QDial):
         self._hover.active = True
         if self._hover.step == self._hover.min:
             self._hover.step = self._hover.min + 1
+        animation_driver().animate(self, self._stepHover)
         QDial.enterEvent(self, event)
 
     def leaveEvent(self, event):
         self._hover.active = False
         if self._hover.step == self._hover.max:
             self._hover.step = self._hover.max - 1
+        animation_driver().animate(self, self._stepHover)
         QDial.leaveEvent(self, event)
 
+    def _stepHover(self):
+        if not self._hover.min < self._hover.step < self._hover.max:
+            return False
+        self._hover.step += 1 if self._hover.active else -1
+        return self._hover.min < self._hover.step < self._hover.max
+
+
+FORMAT_CACHE_LIMIT = 10000
+READOUT_MODES = ("always", "changed", "frame")
+
+
+def ArcDial(label="", start=0, stop=10, initial=0, cast=float, on_change=None, color="#3eb8be", groove_color="#c0c0c0",
+            max_rate=None, min_delta=None, readout_mode="changed", format_cache=False):
+    """ ArcDialBase with a QLineEdit readout on top.
+
+    readout_mode controls how value changes reach the readout: "always" sets
+    the text on every change, "changed" only when the displayed text differs
+    and "frame" additionally defers the update to the next frame. With
+    format_cache an integer dial with a range of at most FORMAT_CACHE_LIMIT
+    formats its readout from a precomputed table.
+
+    """
+    if readout_mode not in READOUT_MODES:
+        raise ValueError(f"readout_mode must be one of {READOUT_MODES}, got {readout_mode!r}")
+
+    initial = min(max(initial, start), stop)
 
-def ArcDial(label="", start=0, stop=10, initial=0, cast=float, on_change=None, color="#3eb8be", groove_color="#c0c0c0"):
-    def genReadoutText(value):
-        return str(cast(value)) if cast is int else f"{value:.2f}"
+    if format_cache and cast is int and stop - start <= FORMAT_CACHE_LIMIT:
+        texts = [str(i) for i in range(int(start), int(stop) + 1)]
+
+        def genReadoutText(value):
+            i = int(value) - int(start)
+            return texts[i] if 0 <= i < len(texts) else str(cast(value))
+    else:
+        def genReadoutText(value):
+            return str(cast(value)) if cast is int else f"{value:.2f}"
+
+    def setReadoutText(value):
+        text = genReadoutText(value)
+        if text != readout.text():
+            readout.setText(text)
+
+    pending = box(value=None)
+
+    def flushReadout():
+        setReadoutText(pending.value)
 
     def updateReadout(value):
-        readout.setText(genReadoutText(value))
+        if readout_mode == "frame":
+            pending.value = value
+            animation_driver().schedule(readout, flushReadout)
+        elif readout_mode == "changed":
+            setReadoutText(value)
+        else:
+            readout.setText(genReadoutText(value))
 
     def updateDial():
         value = cast(readout.text())
@@ -225,13 +356,73 @@ def ArcDial(label="", start=0, stop=10, initial=0, cast=float, on_change=None, c
     else:
         readout.setValidator(QDoubleValidator(start, stop, 2, None))
 
-    dial = ArcDialBase(label, start, stop, initial, color, groove_color)
+    dial = ArcDialBase(label, start, stop, initial, color, groove_color, max_rate, min_delta)
     dial.fvalueChanged.connect(updateReadout)
 
     if on_change:
         dial.fvalueChanged.connect(on_change)
 
-    return v_layout([readout, dial])
+    widget = v_layout([readout, dial])
+    widget.dial = dial
+    widget.readout = readout
+    widget.updateReadout = updateReadout
+    return widget
+
+
+class ArcDialGroup:
+    """ Set the values of many dials in one call.
+
+    Accepts ArcDialBase instances as well as widgets returned by ArcDial, for
+    which the readouts are kept in sync too. Values are clamped and quantized
+    to each dial's fprecision in one vectorized pass. The dials themselves are
+    only touched on the next frame, so bursts of setValues calls between two
+    frames cost a single repaint per dial.
+
+    >>> group = ArcDialGroup([ArcDial("a"), ArcDial("b")])
+    >>> group.setValues(np.array([1.5, 7.25]))
+
+    """
+    def __init__(self, dials):
+        self.dials = [getattr(d, "dial", d) for d in dials]
+        self._readouts = [getattr(d, "updateReadout", None) for d in dials]
+        self._fmin = np.array([d.fmin for d in self.dials], dtype=float)
+        self._span = np.array([d.fmax - d.fmin for d in self.dials], dtype=float)
+        self._precision = np.array([d.fprecision for d in self.dials], dtype=float)
+        self._pending = None
+
+    def __len__(self):
+        return len(self.dials)
+
+    def values(self):
+        return np.array([d._fvalue for d in self.dials], dtype=float)
+
+    def setValues(self, values, emitSignal=False):
+        values = np.asarray(values, dtype=float)
+        if values.shape != self._fmin.shape:
+            raise ValueError(f"Expected {len(self.dials)} values, got shape {values.shape}")
+
+        qvals = np.rint(np.clip((values - self._fmin) / self._span, 0, 1) * self._precision)
+        fvalues = qvals / self._precision * self._span + self._fmin
+
+        self._pending = (fvalues.tolist(), qvals.astype(int).tolist(), emitSignal)
+        animation_driver().schedule(self, self._apply)
+
+    def _apply(self):
+        if self._pending is None:
+            return
+
+        fvalues, qvals, emitSignal = self._pending
+        self._pending = None
+
+        for dial, readout, fvalue, qval in zip(self.dials, self._readouts, fvalues, qvals):
+            if dial._fvalue == fvalue:
+                continue
+
+            dial._applyValue(fvalue, qval)
+            if emitSignal:
+                dial.fvalueChanged.emit(fvalue)
+            elif readout:
+                readout(fvalue)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,344 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+from PySide2.QtWidgets import QWidget, QLineEdit
+from PySide2.QtCore import Qt, Signal, QRect, QRectF
+from PySide2.QtGui import QColor, QFont, QFontMetrics, QPainter, QPalette, QPen, QPixmap, QDoubleValidator, QIntValidator
+from array import array
+from types import SimpleNamespace as box
+import numpy as np
+from dqtwidgets.arcdial import dial_geometry, ball_position
+from dqtwidgets.instrument import Instrumented
+
+
+class ArcDialBank(Instrumented, QWidget):
+    """ Grid of arc dials and their readouts drawn by a single widget.
+
+    Behaves like `count` ArcDial widgets laid out in `columns` columns, but
+    the values live in one array and there is only one QWidget plus a shared
+    line edit for editing readouts. Signals carry the index of the dial.
+
+    >>> bank = ArcDialBank(256, columns=16, start=0, stop=10)
+    >>> bank.fvalueChanged.connect(lambda index, value: print(index, value))
+
+    """
+    fvalueChanged = Signal(int, float)
+    dragStateChanged = Signal(int, bool)
+
+    def __init__(self, count, columns=8, labels=(), start=0, stop=10, initial=0, cast=float,
+                 on_change=None, color="#3eb8be", groove_color="#c0c0c0"):
+        super().__init__()
+        self.setMouseTracking(True)
+
+        self.fmin = start
+        self.fmax = stop
+        self.cast = cast
+
+        initial = min(max(initial, start), stop)
+        self._values = array("d", [initial]) * count
+        self._labels = list(labels) + [""] * (count - len(labels))
+        self._columns = max(1, min(columns, count))
+
+        self._color = QColor(color)
+        self._hover_color = self._color.lighter(127)
+        self._groove_color = QColor(groove_color)
+        self._label_font = QFont(self.font())
+        self._label_font.setPixelSize(10)
+
+        self._drag = box(index=-1, pos=None, value=0)
+        self._hovered = -1
+        self._cache = box(key=None, pixmap=None)
+
+        self._editor = QLineEdit(self)
+        self._editor.setAlignment(Qt.AlignCenter)
+        self._editor.setMaxLength(5)
+        self._editor.hide()
+        self._editing = -1
+        self._editor.returnPressed.connect(self._commitEditor)
+        self._editor.editingFinished.connect(self._editor.hide)
+
+        if cast is int:
+            self._editor.setValidator(QIntValidator(start, stop, self._editor))
+        else:
+            self._editor.setValidator(QDoubleValidator(start, stop, 2, self._editor))
+
+        self.updateSizes()
+
+        if on_change:
+            self.fvalueChanged.connect(on_change)
+
+    def count(self):
+        return len(self._values)
+
+    def value(self, index):
+        return self._values[index]
+
+    def values(self):
+        return self._values.tolist()
+
+    def setValue(self, index, value, emitSignal=False):
+        value = min(max(value, self.fmin), self.fmax)
+        if self._values[index] == value:
+            return
+
+        self._values[index] = value
+        self.update(self.cellRect(index))
+
+        if emitSignal:
+            self.fvalueChanged.emit(index, value)
+
+    def setValues(self, values, emitSignal=False):
+        """ Set all values at once from a sequence or NumPy array. """
+        values = np.clip(np.asarray(values, dtype=float), self.fmin, self.fmax)
+        current = np.frombuffer(self._values, dtype=float)
+        if values.shape != current.shape:
+            raise ValueError(f"Expected {self.count()} values, got shape {values.shape}")
+
+        changed = np.flatnonzero(values != current)
+        current[changed] = values[changed]
+
+        # Qt merges these into a single repaint on the next frame
+        if len(changed) > len(current) // 4:
+            self.update()
+        else:
+            for index in changed.tolist():
+                self.update(self.cellRect(index))
+
+        if emitSignal:
+            for index, value in zip(changed.tolist(), values[changed].tolist()):
+                self.fvalueChanged.emit(index, value)
+
+    def label(self, index):
+        return self._labels[index]
+
+    def setLabel(self, index, label):
+        if self._labels[index] == label:
+            return
+
+        self._labels[index] = label
+        self.update(self.cellRect(index))
+
+    def readoutText(self, value):
+        return str(self.cast(value)) if self.cast is int else f"{value:.2f}"
+
+    def updateSizes(self):
+        self._cache.key = None
+
+        margin = 5
+        dial = 64
+        readout = QFontMetrics(self.font()).height() + 6
+        label = QFontMetrics(self._label_font).height()
+
+        self._geometry = dial_geometry(dial)
+        self._cell = box(
+            width=dial + 2 * margin,
+            height=margin + readout + dial + label + 5 + margin,
+            readout=QRect(margin + (dial - 55) // 2, margin, 55, readout),
+            dial=QRect(margin, margin + readout, dial, dial + label + 5),
+            label=QRect(margin, margin + readout + dial, dial, label + 5))
+
+        rows = -(-self.count() // self._columns)
+        self.setMinimumSize(self._columns * self._cell.width, rows * self._cell.height)
+        self.updateGeometry()
+        self.update()
+
+    def sizeHint(self):
+        return self.minimumSize()
+
+    def cellRect(self, index):
+        row, col = divmod(index, self._columns)
+        return QRect(col * self._cell.width, row * self._cell.height, self._cell.width, self._cell.height)
+
+    def cellAt(self, pos):
+        col = pos.x() // self._cell.width
+        row = pos.y() // self._cell.height
+        if pos.x() < 0 or pos.y() < 0 or col >= self._columns:
+            return -1
+
+        index = row * self._columns + col
+        return index if index < self.count() else -1
+
+    def _cellPart(self, pos):
+        """ Index of the cell under pos and whether it hits the dial or the readout. """
+        index = self.cellAt(pos)
+        if index < 0:
+            return index, None
+
+        local = pos - self.cellRect(index).topLeft()
+        if self._cell.readout.contains(local):
+            return index, "readout"
+        if self._cell.dial.contains(local):
+            return index, "dial"
+        return index, None
+
+    def mousePressEvent(self, event):
+        if event.button() != Qt.LeftButton:
+            return
+
+        index, part = self._cellPart(event.pos())
+        if part == "dial":
+            self._drag.index = index
+            self._drag.pos = event.pos()
+            self._drag.value = self._values[index]
+            self.dragStateChanged.emit(index, True)
+
+    def mouseMoveEvent(self, event):
+        if self._drag.index < 0:
+            self._setHovered(self._cellPart(event.pos())[0])
+            return
+
+        r = (self.fmax - self.fmin) / 4
+        pos = event.pos()
+        dx = r * (pos.x() - self._drag.pos.x()) / self._cell.dial.width()
+        dy = r * (pos.y() - self._drag.pos.y()) / self._cell.dial.height()
+        self.setValue(self._drag.index, self._drag.value + dx - dy, True)
+
+    def mouseReleaseEvent(self, _):
+        if self._drag.index >= 0:
+            index = self._drag.index
+            self._drag.index = -1
+            self.dragStateChanged.emit(index, False)
+
+    def mouseDoubleClickEvent(self, event):
+        index, part = self._cellPart(event.pos())
+        if part == "readout":
+            self.editReadout(index)
+
+    def leaveEvent(self, event):
+        self._setHovered(-1)
+        QWidget.leaveEvent(self, event)
+
+    def _setHovered(self, index):
+        if self._hovered == index:
+            return
+
+        if self._hovered >= 0:
+            self.update(self.cellRect(self._hovered))
+        self._hovered = index
+        if index >= 0:
+            self.update(self.cellRect(index))
+
+    def editReadout(self, index):
+        self._editing = index
+        self._editor.setGeometry(self._cell.readout.translated(self.cellRect(index).topLeft()))
+        self._editor.setText(self.readoutText(self._values[index]))
+        self._editor.selectAll()
+        self._editor.show()
+        self._editor.setFocus()
+
+    def _commitEditor(self):
+        index = self._editing
+        if index >= 0:
+            self.setValue(index, self.cast(self._editor.text()))
+        self._editor.hide()
+
+    def _staticLayer(self):
+        ratio = self.devicePixelRatioF()
+        key = (ratio, self._groove_color.rgba())
+        if self._cache.key == key:
+            return self._cache.pixmap
+
+        size = self._cell.dial.size()
+        pixmap = QPixmap(round(size.width() * ratio), round(size.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setPen(QPen(self._groove_color, 4))
+        painter.drawArc(self._geometry.arc, 216*16, -252*16)
+        painter.end()
+
+        self._cache.key = key
+        self._cache.pixmap = pixmap
+        return pixmap
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        event.accept()
+
+        # Only cells intersecting the exposed rect are drawn
+        rect = event.rect()
+        first_col = max(0, rect.left() // self._cell.width)
+        last_col = min(self._columns - 1, rect.right() // self._cell.width)
+        first_row = max(0, rect.top() // self._cell.height)
+        last_row = rect.bottom() // self._cell.height
+
+        groove = self._staticLayer()
+        palette = self.palette()
+        text_pen = QPen(palette.color(QPalette.Text))
+        label_pen = QPen(palette.color(QPalette.WindowText))
+        frame_pen = QPen(palette.color(QPalette.Mid))
+        base = palette.color(QPalette.Base)
+        geometry = self._geometry
+        span = self.fmax - self.fmin
+
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                index = row * self._columns + col
+                if index >= self.count():
+                    break
+
+                value = self._values[index]
+                x = col * self._cell.width
+                y = row * self._cell.height
+
+                # Readout
+                readout = self._cell.readout.translated(x, y)
+                painter.setPen(frame_pen)
+                painter.setBrush(base)
+                painter.drawRect(readout.adjusted(0, 0, -1, -1))
+                painter.setPen(text_pen)
+                painter.drawText(readout, Qt.AlignCenter, self.readoutText(value))
+
+                # Label
+                if self._labels[index]:
+                    painter.setPen(label_pen)
+                    painter.setFont(self._label_font)
+                    painter.drawText(self._cell.label.translated(x, y), Qt.AlignHCenter | Qt.AlignVCenter,
+                                     self._labels[index])
+                    painter.setFont(self.font())
+
+                dial = self._cell.dial.translated(x, y)
+                painter.drawPixmap(dial.topLeft(), groove)
+
+                # Value arc and ball
+                norm = (value - self.fmin) / span
+                color = self._hover_color if index == self._hovered else self._color
+                painter.setRenderHint(QPainter.Antialiasing, True)
+                painter.translate(dial.topLeft())
+
+                bx, by = ball_position(geometry, norm)
+                painter.setBrush(color)
+                painter.setPen(QPen(color, 0))
+                painter.drawEllipse(QRectF(bx, by, geometry.ball, geometry.ball))
+
+                painter.setPen(QPen(color, 3))
+                painter.drawArc(geometry.arc, 216 * 16, -252 * 16 * norm)
+
+                painter.resetTransform()
+                painter.setRenderHint(QPainter.Antialiasing, False)
+
+
+if __name__ == "__main__":
+    from PySide2.QtWidgets import QApplication
+    import sys
+    app = QApplication([])
+
+    widget = ArcDialBank(64, columns=16, labels=[f"ch {i}" for i in range(64)])
+    widget.fvalueChanged.connect(lambda i, x: print(i, x))
+    widget.show()
+
+    sys.exit(app.exec_())
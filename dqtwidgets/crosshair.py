@@ -13,17 +13,36 @@
 # You should have received a copy of the GNU General Public License along
 # with this program. If not, see http://www.gnu.org/licenses/.
 #
-from PySide2.QtWidgets import QWidget
-from PySide2.QtCore import QSize
-from PySide2.QtGui import QPainter, QPalette
+from PySide2.QtWidgets import QApplication, QWidget, QSizePolicy
+from PySide2.QtCore import Qt, Signal, QSize, QPointF, QRect, QLineF
+from PySide2.QtGui import QPainter, QPainterPath, QPalette, QPen, QColor, QImage, QPixmap, QRegion, QTransform
 from dataclasses import dataclass
+from math import ceil, floor, log2
+import numpy as np
+from dqtwidgets.animation import animation_driver
+from dqtwidgets.instrument import Instrumented
+from dqtwidgets.spatial import PointSet, DensityPyramid
+from dqtwidgets.wasd import SYMBOLS
 
 
-@dataclass
+@dataclass(init=False)
 class Coordinate:
-    x: float = 0
-    y: float = 0
-    z: float = 0
+    """ Point in stage space.
+
+    Slotted, so an instance is three references without a __dict__. The
+    operators return new instances; translate() and scale() modify the
+    coordinate in place for code that tracks positions at high rates.
+
+    """
+    __slots__ = ("x", "y", "z")
+    x: float
+    y: float
+    z: float
+
+    def __init__(self, x=0, y=0, z=0):
+        self.x = x
+        self.y = y
+        self.z = z
 
     def __add__(self, other):
         return Coordinate(self.x + other.x, self.y + other.y, self.z + other.z)
@@ -31,6 +50,24 @@ class Coordinate:
     def __mul__(self, number):
         return Coordinate(self.x * number, self.y * number, self.z * number)
 
+    def set(self, x, y, z=0):
+        self.x = x
+        self.y = y
+        self.z = z
+        return self
+
+    def translate(self, other):
+        self.x += other.x
+        self.y += other.y
+        self.z += other.z
+        return self
+
+    def scale(self, number):
+        self.x *= number
+        self.y *= number
+        self.z *= number
+        return self
+
     def __lt__(self, other):
         return {
             SYMBOLS.left: self.x < other.x,
@@ -46,6 +83,94 @@ class Coordinate:
         }
 
 
+class CoordinateArray:
+    """ Many coordinates stored as one (N, 3) float array.
+
+    Supports the Coordinate operators on all rows at once: adding a
+    Coordinate or another CoordinateArray, scaling by a number and the
+    direction compares, which return a dict of boolean masks.
+
+    >>> points = CoordinateArray([[0, 0, 0], [1, 2, 3]])
+    >>> points + Coordinate(1, 1, 1)
+    >>> (points * 2 < Coordinate(1, 1, 1))["◀"]
+    >>> array([ True, False])
+
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data=()):
+        self.data = np.asarray(data, dtype=float).reshape(-1, 3)
+
+    @classmethod
+    def from_coordinates(cls, coordinates):
+        return cls([(c.x, c.y, c.z) for c in coordinates])
+
+    def __array__(self, dtype=None):
+        return self.data if dtype is None else self.data.astype(dtype)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Coordinate(*self.data[index].tolist())
+        return CoordinateArray(self.data[index])
+
+    def __iter__(self):
+        return (Coordinate(x, y, z) for x, y, z in self.data.tolist())
+
+    def __repr__(self):
+        return f"CoordinateArray({self.data!r})"
+
+    @property
+    def x(self):
+        return self.data[:, 0]
+
+    @property
+    def y(self):
+        return self.data[:, 1]
+
+    @property
+    def z(self):
+        return self.data[:, 2]
+
+    @staticmethod
+    def _operand(other):
+        if isinstance(other, Coordinate):
+            return np.array((other.x, other.y, other.z))
+        return np.asarray(other, dtype=float)
+
+    def __add__(self, other):
+        return CoordinateArray(self.data + self._operand(other))
+
+    def __iadd__(self, other):
+        self.data += self._operand(other)
+        return self
+
+    def __mul__(self, number):
+        return CoordinateArray(self.data * number)
+
+    def __imul__(self, number):
+        self.data *= number
+        return self
+
+    def __lt__(self, other):
+        below = self.data < self._operand(other)
+        return {
+            SYMBOLS.left: below[:, 0],
+            SYMBOLS.forward: below[:, 1],
+            SYMBOLS.down: below[:, 2]
+        }
+
+    def __gt__(self, other):
+        above = self.data > self._operand(other)
+        return {
+            SYMBOLS.right: above[:, 0],
+            SYMBOLS.back: above[:, 1],
+            SYMBOLS.up: above[:, 2],
+        }
+
+
 @dataclass
 class Bounds:
     """ Rectangle defined by two coordinates.
@@ -73,38 +198,770 @@ class Bounds:
         oob_right = coordinate > self.top_right
         return {**oob_left, **oob_right}
 
+    def contains(self, coordinate):
+        """ True if the coordinate is within the bounds, without building dicts. """
+        bl, tr = self.bottom_left, self.top_right
+        return (bl.x <= coordinate.x <= tr.x and
+                bl.y <= coordinate.y <= tr.y and
+                bl.z <= coordinate.z <= tr.z)
+
+    def check(self, points):
+        """ Check a whole (N, 3) array of points against the bounds at once.
+
+        Accepts a NumPy array or a CoordinateArray. Same comparisons as
+        `bounds > coordinate`, but the dict holds one
+        boolean mask per direction and the result also reports the index of
+        the first point outside the bounds, -1 if all points are inside.
+
+        >>> result = b.check(np.array([[1, 1, 0], [-1, 1, 0]]))
+        >>> result.first
+        >>> 1
+        >>> result.masks["◀"]
+        >>> array([False,  True])
+
+        """
+        points = np.asarray(points, dtype=float)
+        if points.ndim != 2 or points.shape[1] != 3:
+            raise ValueError(f"Expected an (N, 3) array of points, got shape {points.shape}")
+
+        bl, tr = self.bottom_left, self.top_right
+        limits = np.array([bl.x, bl.y, bl.z, tr.x, tr.y, tr.z])
+        oob = np.empty((len(points), 6), dtype=bool)
+        np.less(points, limits[:3], out=oob[:, :3])
+        np.greater(points, limits[3:], out=oob[:, 3:])
+
+        outside = oob.any(axis=1)
+        first = int(outside.argmax()) if outside.any() else -1
+
+        directions = (SYMBOLS.left, SYMBOLS.forward, SYMBOLS.down, SYMBOLS.right, SYMBOLS.back, SYMBOLS.up)
+        return BoundsCheck(masks={d: oob[:, i] for i, d in enumerate(directions)}, first=first)
+
+
+@dataclass
+class BoundsCheck:
+    """ Per direction out of bounds masks of a batch of points. """
+    masks: dict
+    first: int
+
+    @property
+    def inside(self):
+        return self.first < 0
+
+
+class Trail:
+    """ Fixed capacity ring buffer of recent positions.
+
+    Samples live in one preallocated (capacity, 3) array, appending is O(1)
+    and overwrites the oldest sample once the buffer is full. `total`
+    counts the samples ever appended and `epoch` changes on clear(), which
+    tells followers like TrailLevels what is new since they last looked.
+
+    """
+    def __init__(self, capacity):
+        self._data = np.zeros((max(1, capacity), 3))
+        self._head = 0
+        self._size = 0
+        self.version = 0
+        self.total = 0
+        self.epoch = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return len(self._data)
+
+    def append(self, coordinate):
+        row = self._data[self._head]
+        row[0] = coordinate.x
+        row[1] = coordinate.y
+        row[2] = coordinate.z
+        self._head = (self._head + 1) % len(self._data)
+        if self._size < len(self._data):
+            self._size += 1
+        self.total += 1
+        self.version += 1
+
+    def extend(self, points):
+        """ Append an (N, 3) array of samples, oldest first. """
+        points = np.asarray(points, dtype=float)[-len(self._data):]
+        n = len(points)
+        end = self._head + n
+        if end <= len(self._data):
+            self._data[self._head:end] = points
+        else:
+            split = len(self._data) - self._head
+            self._data[self._head:] = points[:split]
+            self._data[:n - split] = points[split:]
+        self._head = end % len(self._data)
+        self._size = min(self._size + n, len(self._data))
+        self.total += n
+        self.version += 1
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+        self.epoch += 1
+        self.version += 1
+
+    def array(self):
+        """ Copy of the stored samples, oldest first. """
+        if self._size < len(self._data):
+            return self._data[:self._size].copy()
+        return np.concatenate((self._data[self._head:], self._data[:self._head]))
+
+    def tail(self, n):
+        """ Copy of the last n samples, oldest first. """
+        start = self._head - min(n, self._size)
+        if start >= 0:
+            return self._data[start:self._head].copy()
+        return np.concatenate((self._data[start:], self._data[:self._head]))
+
+
+class _TrailLevel:
+    """ Vertices of one TrailLevels level and the sample number of each, in growable arrays.
+
+    Vertices of dropped samples stay in front of `begin` until the arrays
+    are compacted. Chunk i spans vertices i*CHUNK up to and including the
+    first vertex of chunk i+1, only the boxes of the last chunks are
+    recomputed after an append.
+
+    """
+    def __init__(self, cell=None, origin=None):
+        self.cell = cell
+        self.origin = origin
+        self.points = np.zeros((64, 2))
+        self.samples = np.zeros(64, dtype=np.int64)
+        self.begin = 0
+        self.end = 0
+        self._last = None
+        self._lows = np.zeros((0, 2))
+        self._highs = np.zeros((0, 2))
+        self._boxed = 0
+        self._boxed_end = 0
+
+    def append(self, points, samples):
+        if self.cell is not None and len(points):
+            # Keep a sample where the trail enters another cell
+            cells = np.floor((points - self.origin) / self.cell)
+            keep = np.empty(len(points), dtype=bool)
+            keep[0] = self._last is None or bool(np.any(cells[0] != self._last))
+            keep[1:] = np.any(cells[1:] != cells[:-1], axis=1)
+            self._last = cells[-1]
+            points, samples = points[keep], samples[keep]
+
+        n = len(points)
+        if self.end + n > len(self.points):
+            live = self.end - self.begin
+            capacity = max(len(self.points), 2 * (live + n))
+            grown, numbers = np.zeros((capacity, 2)), np.zeros(capacity, dtype=np.int64)
+            grown[:live] = self.points[self.begin:self.end]
+            numbers[:live] = self.samples[self.begin:self.end]
+            self.points, self.samples = grown, numbers
+            self.begin, self.end = 0, live
+            self._lows, self._highs = np.zeros((0, 2)), np.zeros((0, 2))
+            self._boxed, self._boxed_end = 0, -1
+        self.points[self.end:self.end + n] = points
+        self.samples[self.end:self.end + n] = samples
+        self.end += n
+
+    def drop(self, first):
+        """ Forget the vertices of samples before `first`. """
+        self.begin += int(np.searchsorted(self.samples[self.begin:self.end], first))
+
+    def boxes(self):
+        """ Lows and highs of every chunk from the start of the arrays. """
+        chunk = TrailLevels.CHUNK
+        first = self._boxed
+        if self.end and self.end != self._boxed_end:
+            points = self.points[first * chunk:self.end]
+            starts = np.arange(0, max(len(points) - 1, 1), chunk)
+            joints = points[np.minimum(starts + chunk, len(points) - 1)]
+            lows = np.minimum(np.minimum.reduceat(points, starts), joints)
+            highs = np.maximum(np.maximum.reduceat(points, starts), joints)
+            self._lows = np.concatenate((self._lows[:first], lows))
+            self._highs = np.concatenate((self._highs[:first], highs))
+            # Chunks whose joint vertex exists won't change anymore
+            self._boxed = (self.end - 1) // chunk
+            self._boxed_end = self.end
+        return self._lows, self._highs
+
+
+class TrailLevels:
+    """ Samples of a Trail merged per grid cell at power of two resolutions, following it as it grows.
+
+    Level k keeps the samples where the trail enters another cell of a
+    2**k by 2**k grid over `extent` and shows at most 8 * 2**k of them,
+    about what a view 2**k pixels across can show. Level None holds the
+    raw samples. Levels are built on first use, after that update() only
+    buckets the samples appended since the last update into each level
+    and cuts the ones the trail dropped from the front. Every level keeps
+    the bounding box of each CHUNK consecutive vertices, so a zoomed in
+    view only touches the chunks it can see.
+
+    >>> levels = TrailLevels((-5, -5, 5, 5))
+    >>> levels.update(trail)
+    >>> points, breaks = levels.visible(6, -1, -1, 1, 1)
+
+    """
+    CHUNK = 1024
+
+    def __init__(self, extent):
+        self.extent = extent
+        self._trail = None
+        self._epoch = None
+        self._total = 0
+        self._levels = {None: _TrailLevel()}
+
+    def update(self, trail):
+        """ Follow the samples appended to and dropped from trail since the last update. """
+        new = trail.total - self._total
+        if trail is not self._trail or trail.epoch != self._epoch or not 0 <= new <= len(trail):
+            self._trail, self._epoch = trail, trail.epoch
+            self._levels = {None: _TrailLevel()}
+            new = len(trail)
+        if new:
+            points = trail.tail(new)[:, :2]
+            samples = np.arange(trail.total - new, trail.total)
+            for level in self._levels.values():
+                level.append(points, samples)
+        for level in self._levels.values():
+            level.drop(trail.total - len(trail))
+        self._total = trail.total
+
+    def level(self, k):
+        if k not in self._levels:
+            x0, y0, x1, y1 = self.extent
+            level = _TrailLevel((((x1 - x0) or 1) / 2 ** k, ((y1 - y0) or 1) / 2 ** k), (x0, y0))
+            raw = self._levels[None]
+            level.append(raw.points[raw.begin:raw.end], raw.samples[raw.begin:raw.end])
+            self._levels[k] = level
+        return self._levels[k]
+
+    def visible(self, k, x0, y0, x1, y1):
+        """ Vertices of level k in chunks overlapping a rectangle.
+
+        Also returns a boolean array marking vertices which follow a skipped
+        chunk, the path must not be joined there.
+
+        """
+        level, chunk, raw = self.level(k), self.CHUNK, self._levels[None]
+        begin, end = level.begin, level.end
+        lows, highs = level.boxes()
+        first = begin // chunk
+        lows, highs = lows[first:], highs[first:]
+        ends = k is not None and begin < end and raw.begin < raw.end
+        if ends:
+            # The path still starts and ends at the first and last sample
+            lows, highs = lows.copy(), highs.copy()
+            for i, point in ((0, raw.points[raw.begin]), (-1, raw.points[raw.end - 1])):
+                lows[i] = np.minimum(lows[i], point)
+                highs[i] = np.maximum(highs[i], point)
+        shown = (lows[:, 0] <= x1) & (highs[:, 0] >= x0) & (lows[:, 1] <= y1) & (highs[:, 1] >= y0)
+        if shown.all():
+            index = np.arange(begin, end)
+            breaks = np.zeros(len(index), dtype=bool)
+        else:
+            chunks = np.flatnonzero(shown) + first
+            starts = np.maximum(chunks * chunk, begin)
+            stops = np.minimum(chunks * chunk + chunk, end)
+            # The first vertex of the next chunk closes this one unless that chunk is shown too
+            following = np.append(chunks[1:] == chunks[:-1] + 1, False)
+            stops += (~following) & (stops < end)
+
+            lengths = stops - starts
+            offsets = np.cumsum(lengths) - lengths
+            index = np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+            breaks = np.zeros(len(index), dtype=bool)
+            breaks[offsets[1:]] = ~following[:-1]
+
+        if k is not None and len(index) > 8 * 2 ** k:
+            # A break anywhere between two kept vertices stays a break
+            kept = np.linspace(0, len(index) - 1, 8 * 2 ** k).astype(int)
+            runs = np.cumsum(breaks)[kept]
+            index, breaks = index[kept], np.append(False, runs[1:] != runs[:-1])
+        points = level.points[index]
+        empty = k is not None and begin == end and raw.begin < raw.end
+        if not ends and not empty:
+            return points, breaks
+        if empty or len(index) and index[0] == begin and level.samples[begin] != raw.samples[raw.begin]:
+            points = np.concatenate((raw.points[raw.begin:raw.begin + 1], points))
+            breaks = np.append(False, breaks)
+        if empty or len(index) and index[-1] == end - 1 and level.samples[end - 1] != raw.samples[raw.end - 1]:
+            points = np.concatenate((points, raw.points[raw.end - 1:raw.end]))
+            breaks = np.append(breaks, False)
+        return points, breaks
 
-class CrossHair(QWidget):
-    def __init__(self, coordinate, bounds, width, height):
+
+def decimate(points, budget, size=None, breaks=None):
+    """ Reduce a pixel space polyline to at most `budget` vertices.
+
+    With a view size, segments lying completely outside the view are
+    dropped first, which splits the path into runs. `breaks` marks vertices
+    which must not be joined to the previous one. Consecutive vertices
+    falling in the same pixel are merged, if the path is still too long it
+    is subsampled evenly. Returns the vertices and a boolean array marking
+    the ones that start a new run.
+
+    """
+    n = len(points)
+    starts = np.zeros(n, dtype=bool)
+    if n < 2:
+        starts[:] = True
+        return points, starts
+
+    joined = np.ones(n - 1, dtype=bool) if breaks is None else ~breaks[1:]
+    if size is None:
+        visible = joined
+    else:
+        w, h = size
+        a, b = points[:-1], points[1:]
+        visible = ((np.minimum(a[:, 0], b[:, 0]) <= w) & (np.maximum(a[:, 0], b[:, 0]) >= 0) &
+                   (np.minimum(a[:, 1], b[:, 1]) <= h) & (np.maximum(a[:, 1], b[:, 1]) >= 0) & joined)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[:-1] |= visible
+    keep[1:] |= visible
+    if size is None:
+        keep[:] = True
+    starts[0] = keep[0]
+    starts[1:] = keep[1:] & ~visible
+
+    pixels = np.floor(points)
+    keep[1:] &= np.any(pixels[1:] != pixels[:-1], axis=1) | starts[1:]
+    keep[-1] |= size is None
+    points, starts = points[keep], starts[keep]
+
+    if len(points) > budget:
+        runs = np.cumsum(starts)
+        index = np.linspace(0, len(points) - 1, budget).astype(int)
+        points, runs = points[index], runs[index]
+        starts = np.empty(len(runs), dtype=bool)
+        starts[0] = True
+        starts[1:] = runs[1:] != runs[:-1]
+    return points, starts
+
+
+def splat(xy, width, height, color, radius=2):
+    """ Rasterize pixel space points as discs into a QImage.
+
+    The points are marked in a boolean mask which is then dilated with a
+    disc, so the cost depends on the image size rather than on how many
+    points there are.
+
+    """
+    pad = radius
+    mask = np.zeros((height + 2 * pad, width + 2 * pad), dtype=bool)
+    ix = np.floor(xy).astype(np.int64) + pad
+    keep = (ix[:, 0] >= 0) & (ix[:, 0] < width + 2 * pad) & (ix[:, 1] >= 0) & (ix[:, 1] < height + 2 * pad)
+    mask[ix[keep, 1], ix[keep, 0]] = True
+
+    covered = np.zeros((height, width), dtype=bool)
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            if dx * dx + dy * dy <= radius * radius + radius:
+                covered |= mask[pad + dy:pad + dy + height, pad + dx:pad + dx + width]
+
+    pixels = np.where(covered, np.uint32(color.rgba()), np.uint32(0))
+    return QImage(pixels.tobytes(), width, height, 4 * width, QImage.Format_ARGB32).copy()
+
+
+class CrossHair(Instrumented, QWidget):
+    """ Position of a stage within its bounds.
+
+    The widget can be resized freely, width and height are only the size
+    hint. World coordinates are mapped to the view by a QTransform which is
+    rebuilt on resize or when the bounds change, not on every paint.
+
+    An optional layer of target points can be drawn on the same plane.
+    Hovering and clicking a point emits its id, picking goes through the
+    grid index of the PointSet. After editing the point set in place, call
+    update() to show the changes.
+
+    The mouse wheel zooms around the cursor, dragging pans and a double
+    click resets the view. Points are drawn from a DensityPyramid level
+    about a pixel per cell while zoomed out and from the grid index when
+    zoomed in, the trail is culled to the view and merged per pixel. Either
+    way the work per frame is bounded by the widget size, not by the data.
+
+    >>> crosshair.setPoints(np.random.uniform(-5, 5, (5000, 2)))
+    >>> crosshair.pointClicked.connect(lambda id: move_to(crosshair.points().position(id)))
+
+    """
+    OFFSET = 10
+    PICK_RADIUS = 6
+    MAX_ZOOM = 1e4
+    ZOOM_STEP = 1.25
+    TRAIL_LEVELS = 12
+    POINT_COLOR = QColor(230, 126, 34, 200)
+
+    pointHovered = Signal(int)
+    pointClicked = Signal(int)
+
+    def __init__(self, coordinate, bounds, width, height, trail=0, points=None):
         super().__init__()
-        self._width = width
-        self._height = height
         self._bounds = bounds
         self._coordinate = coordinate
-        self._center = Coordinate(self._width // 2 - 1, self._height // 2 - 1, 0)
+        self._size_hint = QSize(width, height)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setMinimumSize(2 * self.OFFSET + 1, 2 * self.OFFSET + 1)
+        self.resize(self._size_hint)
+
+        self._zoom = 1.0
+        self._view_center = None
+        self._drag = None
+        self._transform = QTransform()
+        self._transform_version = 0
+        self._updateTransform()
+
+        self._trail = None
+        self._trail_cache = (None, None)
+        self._trail_levels = None
+        self.setTrailLength(trail)
+
+        self._points = None
+        self._points_cache = (None, None)
+        self._points_pyramid = (None, None)
+        self._hovered = -1
+        self.pointsLevel = -1
+        self.setPoints(points)
+
+        # Position drawn by the last paint and whether a repaint is scheduled
+        self._painted = None
+        self._pending = False
+        self.coalescedUpdates = 0
+
+    def sizeHint(self):
+        return self._size_hint
+
+    def bounds(self):
+        return self._bounds
+
+    def setBounds(self, bounds):
+        self._bounds = bounds
+        self._setViewCenter(self._view_center)
 
-        self.setFixedSize(QSize(self._width, self._height))
-        offset = 10
+    def zoom(self):
+        return self._zoom
+
+    def setZoom(self, zoom, anchor=None):
+        """ Zoom relative to the whole bounds, keeping the world point under `anchor` in place. """
+        zoom = min(max(zoom, 1.0), self.MAX_ZOOM)
+        cx, cy = self.viewCenter()
+        if anchor is not None:
+            wx, wy = self._toWorld(anchor.x(), anchor.y())
+            ratio = self._zoom / zoom
+            cx, cy = wx - (wx - cx) * ratio, wy - (wy - cy) * ratio
+        self._zoom = zoom
+        self._setViewCenter((cx, cy))
+
+    def viewCenter(self):
+        if self._view_center is None:
+            bl, tr = self._bounds.bottom_left, self._bounds.top_right
+            return (bl.x + tr.x) / 2, (bl.y + tr.y) / 2
+        return self._view_center
+
+    def resetView(self):
+        self._zoom = 1.0
+        self._setViewCenter(None)
+
+    def _setViewCenter(self, center):
+        if center is not None:
+            # Keep the view within the bounds
+            bl, tr = self._bounds.bottom_left, self._bounds.top_right
+            hx = (tr.x - bl.x) / (2 * self._zoom)
+            hy = (tr.y - bl.y) / (2 * self._zoom)
+            center = (min(max(center[0], bl.x + hx), tr.x - hx),
+                      min(max(center[1], bl.y + hy), tr.y - hy))
+        self._view_center = center
+        self._updateTransform()
+        self.update()
+
+    def visibleRect(self):
+        """ (x0, y0, x1, y1) of the world area shown by the widget. """
+        x0, y0 = self._toWorld(0, 0)
+        x1, y1 = self._toWorld(self.width(), self.height())
+        return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+    def transform(self):
+        """ World to view transform. """
+        return self._transform
+
+    def resizeEvent(self, event):
+        self._updateTransform()
+        QWidget.resizeEvent(self, event)
+
+    def _updateTransform(self):
+        bl, tr = self._bounds.bottom_left, self._bounds.top_right
+        sx = self._zoom * (self.width() - 2 * self.OFFSET) / ((tr.x - bl.x) or 1)
+        sy = self._zoom * (self.height() - 2 * self.OFFSET) / ((tr.y - bl.y) or 1)
+        cx, cy = self.viewCenter()
+        self._transform = QTransform(sx, 0, 0, sy, self.width() / 2 - cx * sx, self.height() / 2 - cy * sy)
+        self._transform_version += 1
+        self._painted = None
+
+    def setTrailLength(self, length):
+        """ Keep the last `length` positions and draw them as a path, 0 disables the trail. """
+        if not length:
+            self._trail = None
+        elif self._trail is None or self._trail.capacity != length:
+            trail = Trail(length)
+            if self._trail is not None:
+                trail.extend(self._trail.array())
+            self._trail = trail
+        self.update()
 
-        self._scale = dict(x=(self._width // 2 - offset) / self._bounds.top_right.x,
-                          y=(self._height // 2 - offset) / self._bounds.top_right.y)
+    def trail(self):
+        return self._trail
+
+    def appendSample(self, coordinate):
+        if self._trail is not None:
+            self._trail.append(coordinate)
+            self.update()
+
+    def _trailPath(self):
+        version = (self._trail.version, self._transform_version)
+        if self._trail_cache[0] == version:
+            return self._trail_cache[1]
+
+        bl, tr = self._bounds.bottom_left, self._bounds.top_right
+        extent = (bl.x, bl.y, tr.x, tr.y)
+        if self._trail_levels is None or self._trail_levels.extent != extent:
+            self._trail_levels = TrailLevels(extent)
+        self._trail_levels.update(self._trail)
+
+        # Coarsest level whose cells are still below a pixel
+        t = self._transform
+        span = max(abs((tr.x - bl.x) * t.m11()), abs((tr.y - bl.y) * t.m22()), 1)
+        level = ceil(log2(span))
+        level = level if level <= self.TRAIL_LEVELS else None
+
+        w, h = self.width(), self.height()
+        x0, y0, x1, y1 = self.visibleRect()
+        points, breaks = self._trail_levels.visible(level, x0, y0, x1, y1)
+        points = points * (t.m11(), t.m22()) + (t.dx(), t.dy())
+        points, starts = decimate(points, 2 * (w + h), (w, h), breaks)
+
+        path = QPainterPath()
+        for (x, y), start in zip(points.tolist(), starts.tolist()):
+            if start:
+                path.moveTo(x, y)
+            else:
+                path.lineTo(x, y)
+
+        self._trail_cache = (version, path)
+        return path
+
+    def setPoints(self, points):
+        """ Show a PointSet or an (N, 2) array of target positions, None removes the layer. """
+        if points is not None and not isinstance(points, PointSet):
+            points = PointSet(points)
+        self._points = points
+        self._points_cache = (None, None)
+        self._points_pyramid = (None, None)
+        self._hovered = -1
+        self.setMouseTracking(points is not None)
+        self.update()
+
+    def points(self):
+        return self._points
+
+    def hoveredPoint(self):
+        return self._hovered
+
+    def pointAt(self, pos):
+        """ Id of the point within PICK_RADIUS pixels of a view position, -1 if none. """
+        if self._points is None:
+            return -1
+        t = self._transform
+        x, y = self._toWorld(pos.x(), pos.y())
+        return self._points.pick(x, y, self.PICK_RADIUS / abs(t.m11()), self.PICK_RADIUS / abs(t.m22()))
+
+    def _setHovered(self, id):
+        if id == self._hovered:
+            return
+        region = QRegion()
+        for previous in (self._hovered, id):
+            if previous >= 0:
+                x, y = self._toView(*self._points.position(previous))
+                r = self.PICK_RADIUS
+                region += QRect(floor(x) - r, floor(y) - r, 2 * r + 1, 2 * r + 1)
+        self._hovered = id
+        self.update(region)
+        self.pointHovered.emit(id)
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.setZoom(self._zoom * self.ZOOM_STEP ** steps, event.pos())
+        event.accept()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag = (event.pos(), self.viewCenter(), False)
+        QWidget.mousePressEvent(self, event)
+
+    def mouseMoveEvent(self, event):
+        if self._drag is not None:
+            origin, (cx, cy), moved = self._drag
+            delta = event.pos() - origin
+            if moved or delta.manhattanLength() >= QApplication.startDragDistance():
+                if not moved:
+                    self.setCursor(Qt.ClosedHandCursor)
+                    self._drag = (origin, (cx, cy), True)
+                t = self._transform
+                self._setViewCenter((cx - delta.x() / t.m11(), cy - delta.y() / t.m22()))
+        elif self._points is not None:
+            self._setHovered(self.pointAt(event.pos()))
+        QWidget.mouseMoveEvent(self, event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton and self._drag is not None:
+            moved = self._drag[2]
+            self._drag = None
+            if moved:
+                self.unsetCursor()
+            elif self._points is not None:
+                id = self.pointAt(event.pos())
+                if id >= 0:
+                    self.pointClicked.emit(id)
+        QWidget.mouseReleaseEvent(self, event)
+
+    def mouseDoubleClickEvent(self, event):
+        self.resetView()
+        QWidget.mouseDoubleClickEvent(self, event)
+
+    def leaveEvent(self, event):
+        if self._points is not None:
+            self._setHovered(-1)
+        QWidget.leaveEvent(self, event)
+
+    def _pointsPyramid(self):
+        """ Pyramid of the points, following them through their change log and rebuilt only when that fails. """
+        points, (version, pyramid) = self._points, self._points_pyramid
+        if version == points.version:
+            return pyramid
+
+        changes = points.changes_since(version) if pyramid is not None else None
+        if changes is None or not pyramid.update(*changes):
+            # Some room around the points, so the next ones added nearby still fit
+            x0, y0, x1, y1 = points.bounds()
+            mx, my = ((x1 - x0) or 1) / 8, ((y1 - y0) or 1) / 8
+            pyramid = DensityPyramid((x0 - mx, y0 - my, x1 + mx, y1 + my), points.positions()[1])
+        self._points_pyramid = (points.version, pyramid)
+        return pyramid
+
+    def _pointsLayer(self):
+        """ Visible points rendered once into a pixmap, redrawn when they or the transform change. """
+        ratio = self.devicePixelRatioF()
+        key = (self._points.version, self._transform_version, ratio)
+        if self._points_cache[0] == key:
+            return self._points_cache[1]
+
+        t = self._transform
+        sx, sy = t.m11() * ratio, t.m22() * ratio
+        x0, y0, x1, y1 = self.visibleRect()
+        mx, my = 3 / abs(t.m11()), 3 / abs(t.m22())
+        x0, y0, x1, y1 = x0 - mx, y0 - my, x1 + mx, y1 + my
+
+        pyramid = self._pointsPyramid()
+        self.pointsLevel = pyramid.level_for(sx, sy)
+        if self.pointsLevel < 0:
+            _, xy = self._points.positions(self._points.inside(x0, y0, x1, y1))
+        else:
+            xy, _ = pyramid.cells(self.pointsLevel, x0, y0, x1, y1)
+        xy = xy * (sx, sy) + (t.dx() * ratio, t.dy() * ratio)
+
+        image = splat(xy, round(self.width() * ratio), round(self.height() * ratio), self.POINT_COLOR,
+                      round(2 * ratio))
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(ratio)
+
+        self._points_cache = (key, pixmap)
+        return pixmap
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        scaled_coord = Coordinate(self._coordinate.x * self._scale["x"],
-                                  self._coordinate.y * self._scale["y"], 0)
-        pos = self._center + scaled_coord
+        painter.setRenderHint(QPainter.Antialiasing, True)
+
+        if self._trail is not None and len(self._trail) > 1:
+            painter.save()
+            painter.setPen(QPen(QColor(62, 184, 190, 160), 1))
+            painter.drawPath(self._trailPath())
+            painter.restore()
+
+        if self._points is not None and len(self._points):
+            painter.drawPixmap(0, 0, self._pointsLayer())
+            if self._hovered >= 0:
+                painter.save()
+                pen = QPen(self.POINT_COLOR, 8)
+                pen.setCapStyle(Qt.RoundCap)
+                painter.setPen(pen)
+                painter.drawPoint(QPointF(*self._toView(*self._points.position(self._hovered))))
+                painter.restore()
+
+        x, y = self._painted = self._viewPosition()
+        w, h = self.width(), self.height()
 
         # Two perpendicular lines for the cross-hair
-        painter.drawLine(0, pos.y, self.width() - 1, pos.y)
-        painter.drawLine(pos.x, 0, pos.x, self.height() - 1)
+        painter.drawLine(QLineF(0, y, w, y))
+        painter.drawLine(QLineF(x, 0, x, h))
 
         # Surrounding rectangle
-        painter.drawRect(0, 0, self.width() - 1, self.height() - 1)
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        painter.drawRect(0, 0, w - 1, h - 1)
+
+    def coordinate(self):
+        return self._coordinate
 
     def setCoordinate(self, new_coordinate):
-        self.coordinate = new_coordinate
-        self.update()
+        """ Move the crosshair, repainting at most once per frame.
+
+        Calls arriving before the scheduled repaint only replace the position
+        and are counted in coalescedUpdates.
+
+        """
+        self._coordinate = new_coordinate
+        if self._trail is not None:
+            self._trail.append(new_coordinate)
+
+        if self._pending:
+            self.coalescedUpdates += 1
+            return
+
+        self._pending = True
+        animation_driver().schedule(self, self._flushCoordinate)
+
+    def _flushCoordinate(self):
+        self._pending = False
+
+        # The trail can cross the whole widget
+        if self._trail is not None or self._painted is None:
+            self.update()
+            return
+
+        position = self._viewPosition()
+        if position == self._painted:
+            return
+
+        # Antialiased lines touch the pixels on either side
+        region = QRegion()
+        for x, y in (self._painted, position):
+            region += QRect(0, floor(y) - 2, self.width(), 5)
+            region += QRect(floor(x) - 2, 0, 5, self.height())
+        self.update(region)
+
+    def _toWorld(self, x, y):
+        t = self._transform
+        return (x - t.dx()) / t.m11(), (y - t.dy()) / t.m22()
+
+    def _toView(self, x, y):
+        t = self._transform
+        return t.m11() * x + t.dx(), t.m22() * y + t.dy()
+
+    def _viewPosition(self):
+        return self._toView(self._coordinate.x, self._coordinate.y)
 
 
 if __name__ == "__main__":
@@ -114,7 +971,9 @@ if __name__ == "__main__":
 
     widget = CrossHair(coordinate=Coordinate(2.5, 2.5),
                        bounds=Bounds(Coordinate(-5, -5), Coordinate(5, 5)),
-                       width=180, height=100)
+                       width=180, height=100,
+                       points=np.random.uniform(-5, 5, (200, 2)))
+    widget.pointClicked.connect(lambda id: widget.setCoordinate(Coordinate(*widget.points().position(id))))
     widget.show()
 
     sys.exit(app.exec_())
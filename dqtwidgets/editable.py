@@ -14,7 +14,10 @@
 # with this program. If not, see http://www.gnu.org/licenses/.
 #
 from PySide2.QtWidgets import QTreeWidget, QTreeWidgetItem, QListWidget, QListWidgetItem, QMenu, QAction
-from PySide2.QtCore import Qt, QDataStream
+from PySide2.QtCore import (Qt, Signal, QDataStream, QByteArray, QIODevice, QMimeData, QModelIndex,
+                            QPersistentModelIndex)
+from collections import deque
+from dqtwidgets.feed import ChunkedFeed
 
 
 def add_context_menu(widget):
@@ -37,23 +40,531 @@ def enable_bidirectional_drag(widget):
     widget.setDropIndicatorShown(True)
 
 
-def model_to_dict(model):
-    d = dict()
+NODES_MIME = "application/x-dqtwidgets-nodes"
+
+
+def encode_nodes(nodes):
+    """ (text, children) pairs as a QByteArray, children being nested dicts.
+
+    Nodes are written depth first as their text followed by the number of
+    their children, nothing else of the items is kept.
+
+    """
+    data = QByteArray()
+    stream = QDataStream(data, QIODevice.WriteOnly)
+    stream.writeUInt32(len(nodes))
+    stack = list(reversed(nodes))
+    while stack:
+        text, children = stack.pop()
+        children = children if isinstance(children, dict) else {}
+        stream.writeQString(str(text))
+        stream.writeUInt32(len(children))
+        stack.extend(reversed(list(children.items())))
+    return data
+
+
+def decode_nodes(data):
+    """ Inverse of encode_nodes(), None if the data is cut short. """
+    stream = QDataStream(data)
+    nodes = []
+    stack = [[lambda text, children: nodes.append((text, children)), stream.readUInt32()]]
+    while stack and stream.status() == QDataStream.Ok:
+        frame = stack[-1]
+        if not frame[1]:
+            stack.pop()
+            continue
+        frame[1] -= 1
+        text, count = stream.readQString(), stream.readUInt32()
+        children = {}
+        frame[0](text, children)
+        if count:
+            stack.append([children.__setitem__, count])
+    return nodes if stream.status() == QDataStream.Ok else None
+
+
+class NodesMimeData(QMimeData):
+    """ Dragged texts with the nested dicts of their children.
+
+    Drops in the same process take `nodes` as they are. The NODES_MIME bytes
+    and the plain text are only encoded when another application asks for
+    them.
+
+    """
+    def __init__(self, nodes):
+        super().__init__()
+        self.nodes = nodes
+
+    def formats(self):
+        return [NODES_MIME, "text/plain"]
+
+    def hasFormat(self, mime):
+        return mime in (NODES_MIME, "text/plain")
+
+    def retrieveData(self, mime, kind):
+        if mime == NODES_MIME:
+            return encode_nodes(self.nodes)
+        if mime == "text/plain":
+            return "\n".join(str(text) for text, _ in self.nodes)
+        return super().retrieveData(mime, kind)
+
+
+def dropped_nodes(mime):
+    """ (text, children) pairs carried by a drag, None if it has no NODES_MIME. """
+    nodes = getattr(mime, "nodes", None)
+    if nodes is not None:
+        return nodes
+    if not mime.hasFormat(NODES_MIME):
+        return None
+    return decode_nodes(mime.data(NODES_MIME))
+
+
+class _Node(dict):
+    """ Dict of the children of one model index, remembering their texts in row order. """
+    __slots__ = ("rows", "_last")
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._last = None
+
+    def last(self):
+        """ Last row of every text, rows holding an earlier duplicate are shadowed. """
+        if self._last is None:
+            self._last = {text: row for row, text in enumerate(self.rows)}
+        return self._last
+
+
+def subtree_to_dict(model, parent=QModelIndex(), node=dict, pending=None):
+    """ Nested dicts of the texts below `parent`, walked without recursion.
+
+    Siblings with the same text collapse into one key holding the subtree of
+    the last of them, like assigning them to a dict in row order. `pending`
+    may return the not yet populated children of an index as a dict, which
+    is then used as is.
+
+    """
+    root = node()
+    stack = [(parent, root)]
+    while stack:
+        index, d = stack.pop()
+        children = []
+        for i in range(model.rowCount(index)):
+            child = model.index(i, 0, index)
+            text = child.data()
+            v = pending(child) if pending else None
+            if v is None:
+                v = node()
+                children.append((child, text, v))
+            d[text] = v
+            if node is _Node:
+                d.rows.append(text)
+
+        # Shadowed duplicates never show up in the result
+        stack.extend((child, v) for child, text, v in children if d[text] is v)
+    return root
+
 
-    def fill(parent_index, d):
-        v = {}
-        for i in range(model.rowCount(parent_index)):
-            ix = model.index(i, 0, parent_index)
-            fill(ix, v)
-        d[parent_index.data()] = v
+def model_to_dict(model):
+    return subtree_to_dict(model)
+
+
+def normalized_nodes(children):
+    """ Copy of a nested dict with str texts and dicts as values, None if it has no children.
+
+    Values which are not dicts become leaves. Pending children are kept as
+    such a copy, so they read like the rows created from them and don't
+    change with the dict they came from.
+
+    >>> normalized_nodes({"exposure": 10, 1: {"gain": None}})
+    {'exposure': {}, '1': {'gain': {}}}
+
+    """
+    if not isinstance(children, dict) or not children:
+        return None
+    root = {}
+    stack = [(children, root)]
+    while stack:
+        source, copy = stack.pop()
+        for text, value in source.items():
+            copy[str(text)] = d = {}
+            if isinstance(value, dict) and value:
+                stack.append((value, d))
+    return root
+
+
+class ItemsCache:
+    """ model_to_dict() of a model, kept up to date from the model signals.
+
+    Inserting, removing, moving or renaming rows only rebuilds the dict of
+    their parent, reusing the cached subtrees of the rows that were already
+    there. Changes the cache can't follow drop it and the next access walks
+    the model again. Models with a faster way to produce subtree_to_dict()
+    can pass it as `walk`.
+
+    """
+    def __init__(self, model, pending=None, walk=None):
+        self.model = model
+        self.pending = pending
+        self._moving = None
+        self._walk = walk or (lambda index, node, pending: subtree_to_dict(model, index, node, pending))
+        self._root = None
+        model.rowsInserted.connect(self._inserted)
+        model.rowsRemoved.connect(self._removed)
+        model.rowsAboutToBeMoved.connect(self._aboutToMove)
+        model.rowsMoved.connect(self._moved)
+        model.dataChanged.connect(self._changed)
+        model.modelReset.connect(self.invalidate)
+        model.layoutChanged.connect(self.invalidate)
+
+    def get(self):
+        if self._root is None:
+            self._root = self._walk(QModelIndex(), _Node, self.pending)
+        return self._root
+
+    def invalidate(self, *args):
+        self._root = None
+
+    def copy(self):
+        """ Plain nested dicts of the whole model copied from the cache, pending children too. """
+        return self._copy(self.get(), lambda children: normalized_nodes(children) or {})
+
+    def subtree(self, index):
+        """ Plain nested dicts below index, copied from the cache when it has been built.
+
+        Pending dicts are never changed in place and are shared, not copied.
+
+        """
+        node = None
+        if self._root is not None:
+            try:
+                node = self._node(index)
+            except LookupError:
+                pass
+        if node is None:
+            return self._walk(index, dict, self.pending)
+        return self._copy(node, lambda children: children)
+
+    def _copy(self, node, pending):
+        copy = {}
+        stack = [(node, copy)]
+        while stack:
+            node, d = stack.pop()
+            for text, children in node.items():
+                if isinstance(children, _Node):
+                    d[text] = {}
+                    stack.append((children, d[text]))
+                else:
+                    d[text] = pending(children)
+        return copy
+
+    def _subtree(self, index):
+        children = self.pending(index) if self.pending else None
+        if children is None:
+            children = self._walk(index, _Node, self.pending)
+        return children
+
+    def _node(self, index):
+        """ Cached dict of the children of index, None if it is shadowed by a sibling. """
+        path = []
+        parent = index
+        while parent.isValid():
+            path.append(parent.row())
+            parent = parent.parent()
+
+        node = self._root
+        for row in reversed(path):
+            if not isinstance(node, _Node) or row >= len(node.rows):
+                raise LookupError(row)
+            text = node.rows[row]
+            if node.last()[text] != row:
+                return None
+            container, node = node, node[text]
+
+        # Pending children which have just been populated
+        if not isinstance(node, _Node):
+            node = container[text] = self._subtree(index)
+            if not isinstance(node, _Node):
+                raise LookupError(index)
+        return node
+
+    def _refill(self, parent, origin, texts=None, node=False):
+        """ Rebuild the dict of `parent` in place.
+
+        origin maps every current row to its previous row, or None for rows
+        whose subtree has to be read from the model. texts gives the
+        current row texts when they are known to differ from the cache.
+        The cached dict of parent is looked up unless given as `node`.
+
+        """
+        if node is False:
+            try:
+                node = self._node(parent)
+            except LookupError:
+                self._root = None
+                return
+        if node is None:
+            return
+
+        old, old_rows = dict(node), node.rows
+        old_last = node.last()
+        rows = texts if texts is not None else [None if o is None else old_rows[o] for o in origin]
+        for row, text in enumerate(rows):
+            if text is None and origin[row] is None:
+                rows[row] = self.model.index(row, 0, parent).data()
+        last = {text: row for row, text in enumerate(rows)}
+
+        node.clear()
+        node.rows = rows
+        node._last = last
+        for text in rows:
+            if text in node:
+                continue
+            row = last[text]
+            o = origin[row]
+            if o is not None and old_last.get(old_rows[o]) == o:
+                node[text] = old[old_rows[o]]
+            else:
+                node[text] = self._subtree(self.model.index(row, 0, parent))
+
+    def _inserted(self, parent, first, last):
+        if self._root is None:
+            return
+        n = self.model.rowCount(parent) - (last - first + 1)
+        origin = list(range(first)) + [None] * (last - first + 1) + list(range(first, n))
+        self._refill(parent, origin)
+
+    def _removed(self, parent, first, last):
+        if self._root is None:
+            return
+        n = self.model.rowCount(parent) + (last - first + 1)
+        self._refill(parent, list(range(first)) + list(range(last + 1, n)))
+
+    def _aboutToMove(self, source, start, end, destination, row):
+        # Both parents are looked up before the move can shift their paths
+        self._moving = None
+        if self._root is None:
+            return
+        try:
+            self._moving = (QPersistentModelIndex(source), self._node(source),
+                            QPersistentModelIndex(destination), self._node(destination))
+        except LookupError:
+            self._root = None
+
+    def _moved(self, source, start, end, destination, row):
+        if self._root is None or self._moving is None:
+            return
+        source, source_node, destination, destination_node = self._moving
+        self._moving = None
+
+        count = end - start + 1
+        if source == destination:
+            rest = [r for r in range(self.model.rowCount(source)) if not start <= r <= end]
+            position = row if row < start else row - count
+            self._refill(source, rest[:position] + list(range(start, end + 1)) + rest[position:],
+                         node=source_node)
+        else:
+            n = self.model.rowCount(source) + count
+            self._refill(source, list(range(start)) + list(range(end + 1, n)), node=source_node)
+            n = self.model.rowCount(destination) - count
+            self._refill(destination, list(range(row)) + [None] * count + list(range(row, n)),
+                         node=destination_node)
+
+    def _changed(self, top_left, bottom_right, roles=()):
+        if self._root is None or top_left.column() > 0:
+            return
+        if roles and Qt.DisplayRole not in roles and Qt.EditRole not in roles:
+            return
+
+        parent = top_left.parent()
+        try:
+            node = self._node(parent)
+            if node is None:
+                return
+            texts = list(node.rows)
+            for row in range(top_left.row(), bottom_right.row() + 1):
+                texts[row] = self.model.index(row, 0, parent).data()
+        except LookupError:
+            self._root = None
+            return
+
+        if texts != node.rows:
+            self._refill(parent, list(range(len(texts))), texts)
+
+
+def apply_changes(texts, changes):
+    """ Replay ListCache.changes_since() on a list of texts, in place.
+
+    Returns False when the changes start with a reset, then the texts have
+    to be fetched again.
+
+    """
+    for change in changes:
+        kind, row = change[0], change[1] if len(change) > 1 else 0
+        if kind == "insert":
+            texts[row:row] = change[2]
+        elif kind == "remove":
+            del texts[row:row + change[2]]
+        elif kind == "change":
+            texts[row:row + len(change[2])] = change[2]
+        elif kind == "move":
+            count, destination = change[2], change[3]
+            moved = texts[row:row + count]
+            del texts[row:row + count]
+            at = destination - count if destination > row else destination
+            texts[at:at] = moved
+        else:
+            return False
+    return True
+
+
+class ListCache:
+    """ Texts of the rows of a flat model, kept up to date from the model signals.
+
+    Every change bumps `version` and goes into a log of the last `history`
+    changes, so a consumer who synced at some version can fetch only what
+    changed since instead of copying the whole list:
+
+    - ("insert", row, texts)
+    - ("remove", row, count)
+    - ("change", row, texts)
+    - ("move", row, count, destination), destination counted before the move
+    - ("reset",), the texts have to be fetched again
+
+    Nothing is read or logged before the texts or the version are first
+    asked for. Models with a faster way to read all texts, like
+    QStringListModel's stringList(), can pass it as `snapshot`.
+
+    >>> texts, version = list(cache.get()), cache.version
+    >>> apply_changes(texts, cache.changes_since(version))
+
+    """
+    def __init__(self, model, history=10000, snapshot=None):
+        self.model = model
+        self._snapshot = snapshot or (lambda: self._read(0, model.rowCount()))
+        self._version = 0
+        self._watched = False
+        self._texts = None
+        self._log = deque(maxlen=history)
+        model.rowsInserted.connect(self._inserted)
+        model.rowsRemoved.connect(self._removed)
+        model.rowsMoved.connect(self._moved)
+        model.dataChanged.connect(self._changed)
+        model.modelReset.connect(self._reset)
+        model.layoutChanged.connect(self._reset)
 
-    for i in range(model.rowCount()):
-        ix = model.index(i, 0)
-        fill(ix, d)
-    return d
+    @property
+    def version(self):
+        self._watched = True
+        return self._version
+
+    def get(self):
+        self._watched = True
+        if self._texts is None:
+            self._texts = self._snapshot()
+        return self._texts
+
+    def __iter__(self):
+        """ Texts in row order, read from the model one at a time unless they are cached. """
+        if self._texts is not None:
+            return iter(self._texts)
+        model = self.model
+        return (model.index(row, 0).data() for row in range(model.rowCount()))
+
+    def changes_since(self, version):
+        """ Changes after `version` in order, None if they are no longer all in the log. """
+        behind = self.version - version
+        if not 0 <= behind <= len(self._log):
+            return None
+        return list(self._log)[len(self._log) - behind:]
+
+    def _read(self, first, last):
+        model = self.model
+        return [model.index(row, 0).data() for row in range(first, last)]
+
+    def _record(self, change):
+        self._version += 1
+        self._log.append(change)
+
+    def _skip(self, parent):
+        if parent.isValid():
+            return True
+        if not self._watched:
+            self._version += 1
+            return True
+        return False
+
+    def _inserted(self, parent, first, last):
+        if self._skip(parent):
+            return
+        texts = self._read(first, last + 1)
+        if self._texts is not None:
+            self._texts[first:first] = texts
+        self._record(("insert", first, texts))
+
+    def _removed(self, parent, first, last):
+        if self._skip(parent):
+            return
+        if self._texts is not None:
+            del self._texts[first:last + 1]
+        self._record(("remove", first, last - first + 1))
+
+    def _moved(self, source, start, end, destination, row):
+        if destination.isValid() or self._skip(source):
+            return
+        change = ("move", start, end - start + 1, row)
+        if self._texts is not None:
+            apply_changes(self._texts, [change])
+        self._record(change)
+
+    def _changed(self, top_left, bottom_right, roles=()):
+        if top_left.column() > 0 or roles and Qt.DisplayRole not in roles and Qt.EditRole not in roles:
+            return
+        if self._skip(top_left.parent()):
+            return
+
+        first, last = top_left.row(), bottom_right.row() + 1
+        texts = self._read(first, last)
+        if self._texts is not None:
+            # Flags and other roles changing often come without roles
+            if self._texts[first:last] == texts:
+                return
+            self._texts[first:last] = texts
+        self._record(("change", first, texts))
+
+    def _reset(self, *args):
+        if not self._watched:
+            self._version += 1
+            return
+        self._texts = None
+        self._record(("reset",))
+
+
+class LazyItem(QTreeWidgetItem):
+    """ Tree item holding the nested dict of its children until it is expanded.
+
+    The dict is kept as a normalized_nodes() copy, unless `copy` is False
+    for children which already are one, like those of an expanded item.
+
+    """
+    def __init__(self, text, children=None, copy=True):
+        super().__init__([str(text)])
+        self.pending = normalized_nodes(children) if copy else children or None
+        if self.pending is not None:
+            self.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
 
 
 class EditableTree(QTreeWidget):
+    """ Editable tree of texts with a context menu and drag and drop.
+
+    `nodes` is a nested dict like the one returned by `items`. Only the top
+    level is created up front, the children of an item are created when it
+    is first expanded, so opening a large configuration costs about as much
+    as the part of it that is looked at. Values which are not dicts are
+    treated as leaves.
+
+    >>> tree = EditableTree({"stage": {"x": {}, "y": {}}, "camera": {"exposure": {}}})
+
+    """
     def __init__(self, nodes={}, actions={}):
         # TODO: fix resize bug for windows
         super().__init__()
@@ -68,9 +579,84 @@ class EditableTree(QTreeWidget):
         # Drag'n'drop between e.g. list and tree
         enable_bidirectional_drag(self)
 
-        #TODO: add unpacking logic
-        self.nodes = nodes
         self.itemDoubleClicked.connect(self.edit_item)
+        self.itemExpanded.connect(self._itemExpanded)
+
+        self._items = ItemsCache(self.model(), self.pendingChildren)
+        self.nodes = nodes
+        self.populate(nodes)
+
+    def populate(self, nodes):
+        """ Add the top level of a nested dict, deeper levels follow on expansion. """
+        self.addTopLevelItems([LazyItem(text, children) for text, children in nodes.items()])
+
+    def canFetchMore(self, item):
+        return getattr(item, "pending", None) is not None
+
+    def fetchMore(self, item):
+        """ Create the children of an item which haven't been populated yet. """
+        children, item.pending = item.pending, None
+        item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
+        item.addChildren([LazyItem(text, grandchildren, False) for text, grandchildren in children.items()])
+
+    def _itemExpanded(self, item):
+        if self.canFetchMore(item):
+            self.fetchMore(item)
+
+    def pendingChildren(self, index):
+        return getattr(self.itemFromIndex(index), "pending", None)
+
+    def mimeTypes(self):
+        return [NODES_MIME] + super().mimeTypes()
+
+    def mimeData(self, items):
+        """ The topmost dragged items with their subtrees, pending ones are passed on unexpanded. """
+        selected = set(items)
+        topmost = []
+        for item in items:
+            parent = item.parent()
+            while parent is not None and parent not in selected:
+                parent = parent.parent()
+            if parent is None:
+                topmost.append(item)
+
+        # Rows are looked up once per parent, indexFromItem() is slow from Python
+        rows, paths = {}, {None: []}
+
+        def path(item):
+            parent = item.parent()
+            if parent not in rows:
+                siblings = ([self.topLevelItem(i) for i in range(self.topLevelItemCount())] if parent is None else
+                            [parent.child(i) for i in range(parent.childCount())])
+                rows[parent] = {sibling: row for row, sibling in enumerate(siblings)}
+            if parent not in paths:
+                paths[parent] = path(parent)
+            return paths[parent] + [rows[parent][item]]
+
+        nodes = []
+        for item in sorted(topmost, key=path):
+            children = getattr(item, "pending", None)
+            if children is None:
+                children = self._items.subtree(self.indexFromItem(item, 0))
+            nodes.append((item.text(0), children))
+        return NodesMimeData(nodes)
+
+    def dropMimeData(self, parent, index, data, action):
+        nodes = dropped_nodes(data)
+        if nodes is None:
+            return super().dropMimeData(parent, index, data, action)
+
+        # One insertion for the whole drop, the subtrees stay pending
+        items = [LazyItem(text, children) for text, children in nodes]
+        if parent is None:
+            self.insertTopLevelItems(index if index >= 0 else self.topLevelItemCount(), items)
+        else:
+            # Pending children have no rows yet, whatever was dropped on them goes last
+            if self.canFetchMore(parent):
+                self.fetchMore(parent)
+                index = -1
+            parent.insertChildren(index if index >= 0 else parent.childCount(), items)
+        return True
 
     def add_entry(self):
         i = QTreeWidgetItem()
@@ -79,7 +665,13 @@ class EditableTree(QTreeWidget):
 
     @property
     def items(self):
-        return model_to_dict(self.model())
+        """ Nested dict of the item texts.
+
+        Copied from a cache patched as the tree changes, the result is the
+        caller's to keep or change.
+
+        """
+        return self._items.copy()
 
     def edit_item(self, item, col):
         if not (item.flags() & Qt.ItemIsEditable):
@@ -88,21 +680,81 @@ class EditableTree(QTreeWidget):
 
 
 class EditableList(QListWidget):
+    """ List of editable texts with a context menu and drag and drop.
+
+    Items are added in bulk with addItems() and only made editable when an
+    edit is requested, instead of creating and flagging every item from
+    Python. populate(items, chunked=True) takes any iterable, e.g. a
+    generator, and adds it a frame's worth at a time, `populated` is emitted
+    once all of it is in.
+
+    >>> channels = EditableList()
+    >>> channels.populate((f"channel {i}" for i in range(200_000)), chunked=True)
+
+    """
+    populated = Signal()
+
     def __init__(self, items=[]):
         super().__init__()
         add_context_menu(self)
         self.itemDoubleClicked.connect(self.edit_item)
+        self.setUniformItemSizes(True)
 
         # Drag'n'drop between e.g. list and tree
         enable_bidirectional_drag(self)
 
+        self._feed = ChunkedFeed(self._append, self.populated.emit)
+        self._items = ListCache(self.model())
         self.populate(items)
 
-    def populate(self, items):
-        for item in items:
-            i = QListWidgetItem(item)
-            i.setFlags(i.flags() | Qt.ItemIsEditable)
-            self.addItem(i)
+    def populate(self, items, chunked=False):
+        """ Append the texts, all at once or a frame's worth at a time when chunked.
+
+        While a chunked populate is running, further items are queued behind
+        it to keep their order.
+
+        """
+        if chunked or self._feed.isActive():
+            self._feed.extend(items)
+            return
+        self._append(list(items))
+        self.populated.emit()
+
+    def isPopulating(self):
+        return self._feed.isActive()
+
+    def clear(self):
+        self._feed.stop()
+        super().clear()
+
+    def mimeTypes(self):
+        return [NODES_MIME] + super().mimeTypes()
+
+    def mimeData(self, items):
+        return NodesMimeData([(item.text(), {}) for item in sorted(items, key=self.row)])
+
+    def dropMimeData(self, index, data, action):
+        nodes = dropped_nodes(data)
+        if nodes is None:
+            return super().dropMimeData(index, data, action)
+        # Children of dropped tree nodes have no place in a list
+        self.insertItems(index if index >= 0 else self.count(), [text for text, _ in nodes])
+        return True
+
+    def _append(self, texts):
+        blocked = self.blockSignals(True)
+        self.setUpdatesEnabled(False)
+        try:
+            self.addItems(texts)
+        finally:
+            self.setUpdatesEnabled(True)
+            self.blockSignals(blocked)
+
+    def edit(self, index, *args):
+        item = self.itemFromIndex(index)
+        if item is not None and not (item.flags() & Qt.ItemIsEditable):
+            item.setFlags(item.flags() | Qt.ItemIsEditable)
+        return super().edit(index, *args)
 
     def edit_item(self, item):
         if not (item.flags() & Qt.ItemIsEditable):
@@ -111,7 +763,25 @@ class EditableList(QListWidget):
 
     @property
     def items(self):
-        return [self.item(i).text() for i in range(self.count())]
+        """ Texts of the items in order.
+
+        Copied from a cache patched as the list changes, the result is the
+        caller's to keep or change.
+
+        """
+        return list(self._items.get())
+
+    def iter_items(self):
+        return iter(self._items)
+
+    @property
+    def version(self):
+        """ Counter bumped by every change of the texts, see changes_since(). """
+        return self._items.version
+
+    def changes_since(self, version):
+        """ Changes of the texts after `version` as listed in ListCache, None if too old. """
+        return self._items.changes_since(version)
 
 
 
@@ -124,7 +794,7 @@ if __name__ == "__main__":
     add_action(list_widget, "print list", lambda l: print(l.items))
     add_action(list_widget, "clear list", lambda l: l.clear())
 
-    tree_widget = EditableTree()
+    tree_widget = EditableTree({"stage": {"x": {}, "y": {}, "z": {}}, "camera": {"exposure": {}, "gain": {}}})
     add_action(tree_widget, "print items dict", lambda tree: print(tree.items))
     add_action(tree_widget, "add entry", lambda tree: tree.add_entry())
 
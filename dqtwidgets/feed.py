@@ -0,0 +1,158 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+from collections import deque
+from itertools import chain, count, islice
+from time import perf_counter
+from dqtwidgets.animation import animation_driver
+
+
+class ValueFeed:
+    """ Push values into a dial from any thread.
+
+    push() never blocks: it appends to a bounded deque, which is atomic in
+    CPython. The GUI thread drains the deque once per frame and shows the
+    newest value. With capacity=1 only the latest value is kept, a larger
+    capacity keeps a ring of recent values which are all handed to
+    `on_samples` (e.g. to draw a history) before the dial is set.
+
+    Every sample carries a sequence number, so the GUI side can count what
+    was lost without sharing counters with the writers:
+
+    - dropped: overwritten in the buffer before the GUI thread saw it
+    - coalesced: drained, but superseded by a newer value in the same frame
+
+    >>> feed = ValueFeed(ArcDial("gain"))
+    >>> threading.Thread(target=lambda: feed.push(read_sensor())).start()
+    >>> feed.stats()
+
+    """
+    def __init__(self, dial, capacity=1, on_samples=None, emitSignal=False):
+        self.dial = getattr(dial, "dial", dial)
+        self._readout = getattr(dial, "updateReadout", None)
+        self._on_samples = on_samples
+        self._emitSignal = emitSignal
+
+        self._buffer = deque(maxlen=capacity)
+        self._sequence = count()
+        self._last = -1
+
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+        animation_driver().subscribe(self, self._drain)
+        dial.destroyed.connect(self._unsubscribe)
+
+    def push(self, value):
+        self._buffer.append((next(self._sequence), value))
+
+    def close(self):
+        self._unsubscribe()
+        try:
+            self._drain()
+        except RuntimeError:
+            # The dial is already gone
+            pass
+
+    def stats(self):
+        return dict(written=self._last + 1 + len(self._buffer),
+                    delivered=self.delivered,
+                    dropped=self.dropped,
+                    coalesced=self.coalesced,
+                    pending=len(self._buffer))
+
+    def _unsubscribe(self, *args):
+        animation_driver().unsubscribe(self)
+
+    def _drain(self):
+        samples = []
+        try:
+            while True:
+                samples.append(self._buffer.popleft())
+        except IndexError:
+            pass
+
+        if not samples:
+            return
+
+        # Concurrent writers may append slightly out of sequence order
+        samples.sort(key=lambda sample: sample[0])
+        last = samples[-1][0]
+        self.dropped += last - self._last - len(samples)
+        self.coalesced += len(samples) - 1
+        self.delivered += 1
+        self._last = last
+
+        if self._on_samples:
+            self._on_samples([value for _, value in samples])
+
+        value = samples[-1][1]
+        if self._emitSignal:
+            self.dial.setValue(value, True)
+        else:
+            self.dial.setValue(value)
+            if self._readout:
+                self._readout(self.dial._fvalue)
+
+
+class ChunkedFeed:
+    """ Hand the items of an iterable to a callback in lists, a frame at a time.
+
+    Every frame pulls batches from the iterable until `budget` seconds are
+    spent, so a generator of any length fills a view progressively while the
+    event loop keeps running. Extending an active feed queues the new items
+    behind the remaining ones.
+
+    >>> feed = ChunkedFeed(list_widget.addItems, done=lambda: print("done"))
+    >>> feed.extend(f"channel {i}" for i in range(200_000))
+
+    """
+    BATCH = 1024
+
+    def __init__(self, append, done=None, budget=0.008):
+        self._append = append
+        self._done = done
+        self.budget = budget
+        self._items = None
+
+    def isActive(self):
+        return self._items is not None
+
+    def extend(self, items):
+        self._items = iter(items) if self._items is None else chain(self._items, items)
+        animation_driver().subscribe(self, self._step)
+
+    def stop(self):
+        self._items = None
+        animation_driver().unsubscribe(self)
+
+    def _step(self):
+        start = perf_counter()
+        while perf_counter() - start < self.budget:
+            batch = list(islice(self._items, self.BATCH))
+            try:
+                if batch:
+                    self._append(batch)
+            except RuntimeError:
+                # The receiving widget is already gone
+                self.stop()
+                return
+
+            if len(batch) < self.BATCH:
+                self.stop()
+                if self._done:
+                    self._done()
+                return
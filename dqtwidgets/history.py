@@ -0,0 +1,316 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+from collections import deque
+from PySide2.QtCore import Qt, QObject, Signal, QModelIndex
+from dqtwidgets.animation import animation_driver
+from dqtwidgets.editable import NodesMimeData
+from dqtwidgets.mirror import ModelMirror
+
+
+# Rough bytes per op and per node, only used to stay within the budget
+OP_SIZE = 120
+NODE_SIZE = 100
+
+
+def nodes_size(nodes):
+    """ Approximate memory held by (text, children) pairs and everything below them. """
+    size, stack = 0, [nodes]
+    while stack:
+        for text, children in stack.pop():
+            size += NODE_SIZE + len(str(text))
+            if isinstance(children, dict) and children:
+                stack.append(children.items())
+    return size
+
+
+class EditHistory(QObject):
+    """ Undo and redo for the editable lists and trees.
+
+    Changes are captured from the model signals as compact ops on row
+    paths instead of snapshots of the whole widget:
+
+    - ("insert", path, row, count) only where the new rows are
+    - ("remove", path, row, nodes) the removed rows as (text, children), like a drag carries them
+    - ("move", path, row, count, to, before) where the moved rows are and where they came from
+    - ("rename", path, row, texts) the texts before the change
+
+    Everything changed before the next frame, like a drop, a removed
+    selection or a bulk populate, becomes one entry, and a chunked populate
+    stays one entry which can't be undone until it is done. Undoing an entry replays the inverse
+    of its ops and captures them as the entry to redo. Once the history
+    holds more than `budget` bytes the oldest entries are dropped.
+
+    The old texts come from the ModelMirror of the view, shared with e.g.
+    a SearchFilter on the same view. Expanding a lazy
+    tree isn't an edit and isn't recorded. A model reset is recorded when
+    it empties or fills the model, e.g. clear(), other resets drop the
+    history.
+
+    >>> history = EditHistory(tree)
+    >>> add_action(tree, "undo", lambda tree: history.undo())
+
+    """
+    changed = Signal()
+
+    def __init__(self, view, budget=32 * 1024 * 1024, pending=None):
+        super().__init__(view)
+        self.view = view
+        self.model = model = view.model()
+        self.budget = budget
+
+        self._undo = deque()
+        self._redo = deque()
+        self._size = 0
+        self._open = None
+        self._replaying = None
+        self._before = None
+
+        model.rowsMoved.connect(self._moved)
+        model.modelAboutToBeReset.connect(self._resetting)
+        model.layoutAboutToBeChanged.connect(self._resetting)
+        # Called ahead of the mirror, so it still holds the texts from before each change
+        self._mirror = ModelMirror.forView(view, pending)
+        self._mirror.listen(self._notify, {"rowsInserted": self._inserted,
+                                           "rowsAboutToBeRemoved": self._removing,
+                                           "dataChanged": self._changed})
+        if self._mirror.store is None:
+            self._mirror.build()
+
+    def canUndo(self):
+        return bool(self._open or self._undo)
+
+    def canRedo(self):
+        return bool(self._redo)
+
+    def undo(self):
+        """ Revert the last entry, returns False if there was none or a chunked populate is still running. """
+        if self._populating():
+            return False
+        self.seal()
+        if not self._undo:
+            return False
+        return self._replayEntry(self._undo, self._redo)
+
+    def redo(self):
+        if self._populating():
+            return False
+        self.seal()
+        if not self._redo:
+            return False
+        return self._replayEntry(self._redo, self._undo)
+
+    def seal(self):
+        """ Close the entry being recorded, the next change starts a new one. """
+        if self._open is None:
+            return
+        entry, self._open = self._open, None
+        self._undo.append(entry)
+        self._size += entry[1]
+        self._evict()
+        self.changed.emit()
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._open = None
+        self._size = 0
+        self.changed.emit()
+
+    def memory(self):
+        """ Approximate bytes held by the undo and redo entries and the mirror they are read from. """
+        return self._size + (self._open[1] if self._open else 0) + self._mirror.memory()
+
+    def _replayEntry(self, source, target):
+        ops, size = source.pop()
+        self._size -= size
+        self._replaying = [[], 0]
+        try:
+            reverted = all(self._revert(op) for op in reversed(ops))
+            entry = self._replaying
+        finally:
+            self._replaying = None
+        if not reverted:
+            # The model refused, the entries left no longer fit it
+            self.clear()
+            return False
+
+        target.append(entry)
+        self._size += entry[1]
+        self._evict()
+        self.changed.emit()
+        return True
+
+    def _revert(self, op):
+        kind, model = op[0], self.model
+        parent = self._index(op[1])
+        if kind == "insert":
+            return model.removeRows(op[2], op[3], parent)
+        if kind == "remove":
+            return model.dropMimeData(NodesMimeData(op[3]), Qt.CopyAction, op[2], 0, parent)
+        if kind == "move":
+            return model.moveRows(parent, op[2], op[3], self._index(op[4]), op[5])
+        for row, text in enumerate(op[3], op[2]):
+            model.setData(model.index(row, 0, parent), text)
+        return True
+
+    def _evict(self):
+        while self._size > self.budget and (self._undo or self._redo):
+            self._size -= (self._undo or self._redo).popleft()[1]
+
+    def _record(self, op, size=OP_SIZE):
+        if self._replaying is not None:
+            if not self._merge(self._replaying[0], op):
+                self._replaying[0].append(op)
+                self._replaying[1] += size
+            return
+
+        if self._open is None:
+            if self._redo:
+                self._size -= sum(size for _, size in self._redo)
+                self._redo.clear()
+            self._open = [[], 0]
+            self.changed.emit()
+        ops = self._open[0]
+        if not self._merge(ops, op):
+            ops.append(op)
+            self._open[1] += size
+        animation_driver().schedule(self, self._sealLater)
+
+    def _merge(self, ops, op):
+        """ Fold op into the last op of the entry when that one already covers it. """
+        if not ops:
+            return False
+        last = ops[-1]
+        if last[1] != op[1]:
+            return False
+        if last[0] == op[0] == "insert" and last[2] <= op[2] <= last[2] + last[3]:
+            ops[-1] = ("insert", last[1], last[2], last[3] + op[3])
+            return True
+        # Texts set right after inserting or renaming the same rows
+        if op[0] == "rename" and last[0] == "insert":
+            return last[2] <= op[2] and op[2] + len(op[3]) <= last[2] + last[3]
+        if op[0] == "rename" and last[0] == "rename":
+            return last[2] == op[2] and len(last[3]) == len(op[3])
+        return False
+
+    def _populating(self):
+        populating = getattr(self.view, "isPopulating", None)
+        return populating is not None and populating()
+
+    def _sealLater(self):
+        if self._populating():
+            animation_driver().schedule(self, self._sealLater)
+            return
+        self.seal()
+
+    def _path(self, index):
+        rows = []
+        while index.isValid():
+            rows.append(index.row())
+            index = index.parent()
+        return tuple(reversed(rows))
+
+    def _index(self, path):
+        """ Index of a row path, creating pending children on the way. """
+        index, pending = QModelIndex(), self._mirror.store.pending
+        for row in path:
+            index = self.model.index(row, 0, index)
+            # Rows restored by an undo come back lazy, later entries may reach below them
+            if self._mirror.nodeId(index) in pending:
+                if hasattr(self.view, "itemFromIndex"):
+                    self.view.fetchMore(self.view.itemFromIndex(index))
+                else:
+                    self.model.fetchMore(index)
+        return index
+
+    def _inserted(self, parent, first, last):
+        mirror = self._mirror
+        id = mirror.nodeId(parent)
+        # Pending children being created, e.g. on expanding a lazy tree
+        if id is not None and id in mirror.store.pending:
+            return
+        self._record(("insert", self._path(parent), first, last - first + 1))
+
+    def _removing(self, parent, first, last):
+        mirror = self._mirror
+        id = mirror.nodeId(parent)
+        if id is None:
+            return
+        nodes = mirror.store.nodes(mirror.store.children[id][first:last + 1])
+        self._record(("remove", self._path(parent), first, nodes), OP_SIZE + nodes_size(nodes))
+
+    def _moved(self, source, start, end, destination, row):
+        count = end - start + 1
+        if source == destination:
+            row = row - count if row > start else row
+            before = start + count if start > row else start
+        else:
+            before = start
+        self._record(("move", self._path(destination), row, count, self._path(source), before))
+
+    def _changed(self, top_left, bottom_right, roles=()):
+        if top_left.column() > 0 or roles and Qt.DisplayRole not in roles and Qt.EditRole not in roles:
+            return
+        mirror, parent = self._mirror, top_left.parent()
+        id = mirror.nodeId(parent)
+        if id is None:
+            return
+
+        first, last = top_left.row(), bottom_right.row() + 1
+        kids = mirror.store.children[id][first:last]
+        texts = [mirror.store.text[kid] for kid in kids]
+        if texts != [self.model.index(row, 0, parent).data() for row in range(first, last)]:
+            self._record(("rename", self._path(parent), first, texts), OP_SIZE + sum(len(str(text)) for text in texts))
+
+    def _resetting(self):
+        self._before = self._mirror.store
+
+    def _notify(self, op):
+        if op[0] != "reset":
+            return
+        before, self._before = self._before, None
+        self._mirror.build()
+        if before is None:
+            # The mirror lost track of the model, the recorded paths can't be trusted
+            return self.clear()
+
+        had, has = before.rowCount(0), self.model.rowCount()
+        if not had and has:
+            self._record(("insert", (), 0, has))
+        elif had and not has:
+            nodes = before.nodes(before.children[0])
+            self._record(("remove", (), 0, nodes), OP_SIZE + nodes_size(nodes))
+        elif had or has:
+            self.clear()
+
+
+if __name__ == "__main__":
+    from PySide2.QtWidgets import QApplication
+    from dqtwidgets.editable import EditableTree, add_action
+    import sys
+    app = QApplication([])
+
+    tree = EditableTree({f"group {i}": {f"channel {i}.{j}": {} for j in range(100)} for i in range(2000)})
+    history = EditHistory(tree)
+    add_action(tree, "add entry", lambda tree: tree.add_entry())
+    add_action(tree, "remove selected", lambda tree: [(item.parent() or tree.invisibleRootItem()).removeChild(item)
+                                                      for item in tree.selectedItems()])
+    add_action(tree, "undo", lambda tree: history.undo())
+    add_action(tree, "redo", lambda tree: history.redo())
+    add_action(tree, "print history size", lambda tree: print(f"{history.memory()} bytes"))
+    tree.show()
+
+    sys.exit(app.exec_())
@@ -16,9 +16,10 @@
 from PySide2.QtCore import Qt, QPoint
 from PySide2.QtWidgets import QLabel, QSizePolicy
 from PySide2.QtGui import QPixmap, QPainter
+from dqtwidgets.instrument import Instrumented
 
 
-class ScalableImage(QLabel):
+class ScalableImage(Instrumented, QLabel):
     def __init__(self, path, max_height=200):
         super().__init__()
         self.pixmap = QPixmap(path)
@@ -0,0 +1,218 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+from PySide2.QtWidgets import QWidget
+from PySide2.QtCore import Qt, QEvent, QTimer, QRect
+from PySide2.QtGui import QPainter, QColor, QFont, QFontMetrics
+from time import perf_counter
+import types
+
+
+PAINT = int(QEvent.Paint)
+EVENT_NAMES = {
+    int(QEvent.MouseButtonPress): "MouseButtonPress",
+    int(QEvent.MouseButtonRelease): "MouseButtonRelease",
+    int(QEvent.MouseButtonDblClick): "MouseButtonDblClick",
+    int(QEvent.MouseMove): "MouseMove",
+    int(QEvent.Wheel): "Wheel",
+    int(QEvent.KeyPress): "KeyPress",
+    int(QEvent.KeyRelease): "KeyRelease",
+    int(QEvent.Enter): "Enter",
+    int(QEvent.Leave): "Leave",
+    int(QEvent.Resize): "Resize",
+}
+
+
+class Histogram:
+    """ Durations in power of two buckets of microseconds.
+
+    Bucket i counts durations below 2**i microseconds, the last bucket takes
+    everything longer than about a minute.
+
+    """
+    BUCKETS = 27
+
+    def __init__(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        us = int(seconds * 1e6)
+        self.buckets[min(us.bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """ Upper bound in seconds of the bucket holding the p-th percentile. """
+        if not self.count:
+            return 0.0
+
+        target = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min(2 ** i * 1e-6, self.max)
+        return self.max
+
+    def summary(self):
+        return dict(count=self.count,
+                    mean=self.total / self.count if self.count else 0.0,
+                    p50=self.percentile(50),
+                    p99=self.percentile(99),
+                    max=self.max)
+
+
+class Probe:
+    """ Paint, update and event statistics collected for one widget.
+
+    `updates` counts the calls to update(), the paint histogram the paints
+    Qt actually delivered, which merges pending updates into one.
+
+    """
+    def __init__(self):
+        self.paint = Histogram()
+        self.events = {}
+        self.updates = 0
+
+    def reset(self):
+        self.__init__()
+
+    def record(self, widget, e, elapsed):
+        t = int(e.type())
+        if t == PAINT:
+            self.paint.add(elapsed)
+        elif t in EVENT_NAMES:
+            name = EVENT_NAMES[t]
+            if name not in self.events:
+                self.events[name] = Histogram()
+            self.events[name].add(elapsed)
+
+    def report(self):
+        return dict(paint=self.paint.summary(),
+                    updates=self.updates,
+                    paints=self.paint.count,
+                    events={name: h.summary() for name, h in self.events.items()})
+
+
+def _timedEvent(self, e):
+    start = perf_counter()
+    result = type(self).event(self, e)
+    self._probe.record(self, e, perf_counter() - start)
+    return result
+
+
+def _countedUpdate(self, *args):
+    self._probe.updates += 1
+    type(self).update(self, *args)
+
+
+def instrument(widget):
+    """ Start recording paint and event timings and update() calls of any QWidget.
+
+    The widget gets event() and update() overrides bound to the instance,
+    which uninstrument() removes again, so widgets which aren't
+    instrumented don't pay for them.
+
+    """
+    probe = getattr(widget, "_probe", None)
+    if probe is not None:
+        return probe
+
+    probe = Probe()
+    widget._probe = probe
+    # Shiboken only dispatches virtuals to bound methods
+    widget.event = types.MethodType(_timedEvent, widget)
+    widget.update = types.MethodType(_countedUpdate, widget)
+    return probe
+
+
+def uninstrument(widget):
+    if getattr(widget, "_probe", None) is None:
+        return
+
+    del widget.event
+    del widget.update
+    widget._probe = None
+
+
+class Instrumented:
+    """ Mixin giving custom painted widgets an opt-in performance probe.
+
+    Nothing is timed or counted before enableInstrumentation(), until
+    then the widget handles its events as if the mixin wasn't there.
+
+    >>> dial.enableInstrumentation()
+    >>> dial.instrumentation().report()
+
+    """
+    _probe = None
+
+    def enableInstrumentation(self, overlay=False):
+        probe = instrument(self)
+        if overlay and getattr(self, "_overlay", None) is None:
+            self._overlay = InstrumentOverlay(self, probe)
+            self._overlay.show()
+        return probe
+
+    def disableInstrumentation(self):
+        overlay = getattr(self, "_overlay", None)
+        if overlay is not None:
+            overlay.deleteLater()
+            self._overlay = None
+        uninstrument(self)
+
+    def instrumentation(self):
+        return self._probe
+
+
+class InstrumentOverlay(QWidget):
+    """ Small opaque box in the corner of a widget showing its probe.
+
+    The overlay paints its own background, so refreshing it does not cause
+    the instrumented widget underneath to repaint.
+
+    """
+    def __init__(self, parent, probe, interval=500):
+        super().__init__(parent)
+        self.probe = probe
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+
+        self._font = QFont(self.font())
+        self._font.setPixelSize(9)
+        metrics = QFontMetrics(self._font)
+        self.resize(metrics.horizontalAdvance("paint 99999 upd 99999"), 3 * metrics.height())
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.update)
+        self._timer.start(interval)
+
+    def paintEvent(self, event):
+        paint = self.probe.paint.summary()
+        lines = [f"paint {paint['count']} upd {self.probe.updates}",
+                 f"mean {paint['mean'] * 1e6:.0f} us",
+                 f"p99 {paint['p99'] * 1e6:.0f} us"]
+
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 255))
+        painter.setPen(QColor("#3eb8be"))
+        painter.setFont(self._font)
+        painter.drawText(QRect(2, 0, self.width() - 2, self.height()), Qt.AlignLeft | Qt.AlignVCenter,
+                         "\n".join(lines))
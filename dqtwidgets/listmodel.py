@@ -0,0 +1,159 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+from PySide2.QtWidgets import QListView
+from PySide2.QtCore import Qt, Signal, QStringListModel
+from dqtwidgets.editable import (add_context_menu, enable_bidirectional_drag, ListCache, NODES_MIME, NodesMimeData,
+                                 dropped_nodes)
+from dqtwidgets.feed import ChunkedFeed
+
+
+class ListModel(QStringListModel):
+    """ QStringListModel which can grow at the end without a reset.
+
+    setStringList() resets the model and makes views forget their selection
+    and scroll position, extend() appends with one rows inserted and one
+    data changed notification. Rows are counted and looked up in C++, which
+    keeps relayouting a view of millions of rows out of Python.
+
+    >>> model = ListModel(["x", "y"])
+    >>> model.extend(f"channel {i}" for i in range(1000))
+
+    """
+    def __init__(self, texts=(), parent=None):
+        super().__init__([str(text) for text in texts], parent)
+
+    def extend(self, texts):
+        self.insertTexts(self.rowCount(), texts)
+
+    def insertTexts(self, row, texts):
+        """ Insert texts before row with one rows inserted and one data changed notification. """
+        texts = [str(text) for text in texts]
+        if not texts:
+            return
+
+        if not self.rowCount():
+            self.setStringList(texts)
+            return
+
+        self.insertRows(row, len(texts))
+        blocked = self.blockSignals(True)
+        try:
+            for i, text in enumerate(texts, row):
+                self.setData(self.index(i), text)
+        finally:
+            self.blockSignals(blocked)
+        self.dataChanged.emit(self.index(row), self.index(row + len(texts) - 1), [Qt.DisplayRole, Qt.EditRole])
+
+    def mimeTypes(self):
+        return [NODES_MIME] + super().mimeTypes()
+
+    def mimeData(self, indexes):
+        texts = self.stringList()
+        rows = sorted(set(index.row() for index in indexes if index.isValid()))
+        return NodesMimeData([(texts[row], {}) for row in rows])
+
+    def dropMimeData(self, data, action, row, column, parent):
+        nodes = dropped_nodes(data)
+        if nodes is None:
+            return super().dropMimeData(data, action, row, column, parent)
+        if action == Qt.IgnoreAction:
+            return True
+
+        if parent.isValid():
+            row = parent.row()
+        elif row < 0:
+            row = self.rowCount()
+        # Children of dropped tree nodes have no place in a list
+        self.insertTexts(row, [text for text, _ in nodes])
+        return True
+
+
+class EditableListView(QListView):
+    """ EditableList on a ListModel, for lists with millions of texts.
+
+    Same context menu, in place editing and drag and drop as EditableList,
+    but the texts live in one string list instead of a QListWidgetItem each.
+
+    >>> channels = EditableListView()
+    >>> channels.populate((f"channel {i}" for i in range(1_000_000)), chunked=True)
+
+    """
+    populated = Signal()
+
+    def __init__(self, items=[]):
+        super().__init__()
+        add_context_menu(self)
+        self.setUniformItemSizes(True)
+        self.setModel(ListModel(parent=self))
+
+        # Drag'n'drop between e.g. list and tree
+        enable_bidirectional_drag(self)
+
+        self.doubleClicked.connect(self.edit_item)
+        self._feed = ChunkedFeed(self.model().extend, self.populated.emit)
+        self._items = ListCache(self.model(), snapshot=self.model().stringList)
+        self.populate(items)
+
+    def populate(self, items, chunked=False):
+        """ Append the texts, all at once or a frame's worth at a time when chunked. """
+        if chunked or self._feed.isActive():
+            self._feed.extend(items)
+            return
+        self.model().extend(items)
+        self.populated.emit()
+
+    def isPopulating(self):
+        return self._feed.isActive()
+
+    def clear(self):
+        self._feed.stop()
+        self.model().setStringList([])
+
+    def count(self):
+        return self.model().rowCount()
+
+    @property
+    def items(self):
+        """ Texts in order, copied from a cache patched as the list changes. """
+        return list(self._items.get())
+
+    def iter_items(self):
+        return iter(self._items)
+
+    @property
+    def version(self):
+        return self._items.version
+
+    def changes_since(self, version):
+        return self._items.changes_since(version)
+
+    def edit_item(self, index):
+        self.edit(index)
+
+
+if __name__ == "__main__":
+    from PySide2.QtWidgets import QApplication
+    from dqtwidgets.editable import add_action
+    import sys
+    app = QApplication([])
+
+    channels = EditableListView()
+    channels.populate((f"channel {i}" for i in range(1_000_000)), chunked=True)
+    add_action(channels, "print count", lambda l: print(l.count()))
+    add_action(channels, "clear list", lambda l: l.clear())
+    channels.show()
+
+    sys.exit(app.exec_())
@@ -0,0 +1,283 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+from PySide2.QtWidgets import QTreeView
+from PySide2.QtCore import Qt, QModelIndex
+from dqtwidgets.treemodel import NodeStore
+
+
+# Rough bytes per mirrored node, texts and pending dicts are shared with the model
+NODE_SIZE = 100
+
+
+class ModelMirror:
+    """ Texts of a view's model copied into a NodeStore, kept up to date from the model signals.
+
+    Lists and trees are both mirrored as a tree of node ids, so their texts
+    and the subtrees of their rows can be read without going through the
+    model, also when the model is about to change them. Children which a
+    lazy model hasn't created yet stay pending dicts, like in NodeStore.
+
+    Nothing is copied until build(). After that every change is followed
+    and passed to every listener as a compact op:
+
+    - ("clear",) before build() copies the model
+    - ("add", ids, texts) for new nodes
+    - ("pending", id, children) for new nodes with pending children
+    - ("unpending", id) when the pending children of a node were created
+    - ("remove", ids) removed nodes and their descendants, before they leave the store
+    - ("rename", ids, texts)
+    - ("move",) rows moved, ids stay the same
+    - ("reset",) the mirror was dropped and has to be built again
+
+    A listener joining a built mirror is first sent its contents. Hooks
+    passed to listen() by model signal name are called with the signal's
+    arguments before the mirror follows it, so they still see the mirror
+    as it was before the change. forView() shares one mirror between
+    everything following the same view.
+
+    >>> mirror = ModelMirror.forView(tree)
+    >>> mirror.listen(print)
+    >>> mirror.build()
+    >>> mirror.text(index)
+
+    """
+    def __init__(self, view, pending=None, notify=None):
+        self.view = view
+        self.model = model = view.model()
+        self.pending = pending or getattr(view, "pendingChildren", None) or getattr(model, "pendingChildren", None)
+        self.store = None
+        self._flat = not isinstance(view, QTreeView)
+        self._listeners = []
+        if notify is not None:
+            self.listen(notify)
+
+        model.rowsInserted.connect(self._inserted)
+        model.rowsAboutToBeRemoved.connect(self._removing)
+        model.rowsAboutToBeMoved.connect(self._moving)
+        model.dataChanged.connect(self._changed)
+        model.modelReset.connect(self.reset)
+        model.layoutChanged.connect(self.reset)
+
+    @classmethod
+    def forView(cls, view, pending=None):
+        """ The mirror shared by everything following the model of view, created on first use. """
+        mirror = getattr(view, "_modelMirror", None)
+        if mirror is None or mirror.model is not view.model():
+            mirror = view._modelMirror = cls(view, pending)
+        return mirror
+
+    def listen(self, notify, before=None):
+        """ Pass the ops to notify, `before` maps model signal names to hooks called ahead of the mirror. """
+        self._listeners.append((notify, before or {}))
+        if self.store is not None:
+            self._announce(notify)
+
+    def unlisten(self, notify):
+        self._listeners = [listener for listener in self._listeners if listener[0] != notify]
+
+    def notify(self, op):
+        for notify, _ in list(self._listeners):
+            notify(op)
+
+    def _before(self, signal, *args):
+        for _, before in list(self._listeners):
+            hook = before.get(signal)
+            if hook is not None:
+                hook(*args)
+
+    def build(self):
+        store = getattr(self.model, "store", None)
+        if isinstance(store, NodeStore):
+            self.store = store.copy()
+            self._announce(self.notify)
+        else:
+            self.notify(("clear",))
+            self.store = NodeStore()
+            self._mirror(QModelIndex(), 0, 0, self.model.rowCount() - 1)
+
+    def _announce(self, notify):
+        """ Send the whole store to notify, as ops building it from scratch. """
+        store = self.store
+        notify(("clear",))
+        ids = [id for id in range(1, len(store.text)) if store.parent[id] >= 0]
+        notify(("add", ids, [store.text[id] for id in ids]))
+        for id, children in store.pending.items():
+            notify(("pending", id, children))
+
+    def reset(self, *args):
+        self.store = None
+        self.notify(("reset",))
+
+    def memory(self):
+        """ Approximate bytes held by the mirrored nodes. """
+        return 0 if self.store is None else NODE_SIZE * len(self.store.text)
+
+    def nodeId(self, index):
+        """ Id of the node of index, None if the mirror isn't built or out of step. """
+        if self.store is None:
+            return None
+        rows = []
+        while index.isValid():
+            rows.append(index.row())
+            index = index.parent()
+        id = 0
+        for row in reversed(rows):
+            kids = self.store.children[id]
+            if not kids or row >= len(kids):
+                return None
+            id = kids[row]
+        return id
+
+    def index(self, id):
+        store, rows = self.store, []
+        while id > 0:
+            rows.append(store.row[id])
+            id = store.parent[id]
+        index = QModelIndex()
+        for row in reversed(rows):
+            index = self.model.index(row, 0, index)
+        return index
+
+    def text(self, index):
+        id = self.nodeId(index)
+        return None if id is None else self.store.text[id]
+
+    def _mirror(self, parent, id, first, last):
+        """ Copy rows first..last of parent and everything below them into the store. """
+        model, store = self.model, self.store
+        added, texts = [], []
+        stack = [(parent, id, first, last)] if last >= first else []
+        while stack:
+            parent, id, first, last = stack.pop()
+            if not parent.isValid() and hasattr(model, "stringList"):
+                rows = model.stringList()[first:last + 1]
+                ids = store.insert(id, first, rows)
+                added += ids
+                texts += rows
+                continue
+
+            if hasattr(self.view, "invisibleRootItem"):
+                # Walking tree widget items is several times faster than indexes
+                item = self.view.itemFromIndex(parent) if parent.isValid() else self.view.invisibleRootItem()
+                self._mirrorItems(item, id, first, last, added, texts)
+                continue
+
+            indexes = [model.index(row, 0, parent) for row in range(first, last + 1)]
+            rows = [index.data() for index in indexes]
+            pending = [self.pending(index) for index in indexes] if self.pending else ()
+            ids = store.insert(id, first, rows, pending, copy=False)
+            added += ids
+            texts += rows
+            if self._flat:
+                continue
+            for index, child in zip(indexes, ids):
+                if child in store.pending:
+                    self.notify(("pending", child, store.pending[child]))
+                n = model.rowCount(index)
+                if n:
+                    stack.append((index, child, 0, n - 1))
+        self.notify(("add", added, texts))
+
+    def _mirrorItems(self, item, id, first, last, added, texts):
+        store = self.store
+        stack = [(item, id, first, last)]
+        while stack:
+            item, id, first, last = stack.pop()
+            items = [item.child(row) for row in range(first, last + 1)]
+            rows = [item.text(0) for item in items]
+            ids = store.insert(id, first, rows, [getattr(item, "pending", None) for item in items], copy=False)
+            added += ids
+            texts += rows
+            for item, child in zip(items, ids):
+                if child in store.pending:
+                    self.notify(("pending", child, store.pending[child]))
+                n = item.childCount()
+                if n:
+                    stack.append((item, child, 0, n - 1))
+
+    # Hooks see the mirror before each change, which is followed even when one of them fails
+    def _inserted(self, parent, first, last):
+        try:
+            self._before("rowsInserted", parent, first, last)
+        finally:
+            self._insert(parent, first, last)
+
+    def _removing(self, parent, first, last):
+        try:
+            self._before("rowsAboutToBeRemoved", parent, first, last)
+        finally:
+            self._remove(parent, first, last)
+
+    def _changed(self, top_left, bottom_right, roles=()):
+        try:
+            self._before("dataChanged", top_left, bottom_right, roles)
+        finally:
+            self._rename(top_left, bottom_right, roles)
+
+    def _insert(self, parent, first, last):
+        if self.store is None:
+            return
+        id = self.nodeId(parent)
+        if id is None:
+            return self.reset()
+        if self.store.pending.pop(id, None) is not None:
+            self.notify(("unpending", id))
+        self._mirror(parent, id, first, last)
+
+    def _remove(self, parent, first, last):
+        if self.store is None:
+            return
+        id = self.nodeId(parent)
+        if id is None:
+            return self.reset()
+
+        store = self.store
+        removed, stack = [], list((store.children[id] or [])[first:last + 1])
+        while stack:
+            child = stack.pop()
+            removed.append(child)
+            stack.extend(store.children[child] or ())
+        self.notify(("remove", removed))
+        store.remove(id, first, last - first + 1)
+
+    def _moving(self, source, start, end, destination, row):
+        if self.store is None:
+            return
+        source_id, destination_id = self.nodeId(source), self.nodeId(destination)
+        if source_id is None or destination_id is None:
+            return self.reset()
+        self.store.move(source_id, start, end - start + 1, destination_id, row)
+        self.notify(("move",))
+
+    def _rename(self, top_left, bottom_right, roles):
+        if self.store is None or top_left.column() > 0:
+            return
+        if roles and Qt.DisplayRole not in roles and Qt.EditRole not in roles:
+            return
+        id = self.nodeId(top_left.parent())
+        if id is None:
+            return self.reset()
+
+        store, kids = self.store, self.store.children[id]
+        ids, texts = [], []
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            text = self.model.index(row, 0, top_left.parent()).data()
+            if text != store.text[kids[row]]:
+                store.text[kids[row]] = text
+                ids.append(kids[row])
+                texts.append(text)
+        if ids:
+            self.notify(("rename", ids, texts))
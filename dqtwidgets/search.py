@@ -0,0 +1,353 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+from collections import deque
+from itertools import count
+import threading
+from PySide2.QtWidgets import QTreeView
+from PySide2.QtCore import QObject, Signal, QModelIndex
+from dqtwidgets.animation import animation_driver
+from dqtwidgets.feed import ChunkedFeed
+from dqtwidgets.mirror import ModelMirror
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """ Case insensitive substring search over texts kept by id.
+
+    Every text is filed under its overlapping three character grams. A query
+    intersects the ids of its grams, rarest first, and only checks the few
+    candidates left. Patterns shorter than three characters scan all texts.
+    Adding, changing or removing a text only touches its own grams.
+
+    >>> index = TrigramIndex()
+    >>> index.add(1, "camera exposure")
+    >>> index.query("expo")
+    {1}
+
+    """
+    CHECK_EVERY = 4096
+
+    def __init__(self):
+        self._texts = {}
+        self._grams = {}
+
+    def __len__(self):
+        return len(self._texts)
+
+    def add(self, id, text):
+        """ Add or replace the text of id. """
+        self.remove(id)
+        text = str(text or "").casefold()
+        self._texts[id] = text
+        grams = self._grams
+        for gram in trigrams(text):
+            ids = grams.get(gram)
+            if ids is None:
+                grams[gram] = {id}
+            else:
+                ids.add(id)
+
+    def remove(self, id):
+        text = self._texts.pop(id, None)
+        if text is None:
+            return
+        for gram in trigrams(text):
+            ids = self._grams[gram]
+            ids.discard(id)
+            if not ids:
+                del self._grams[gram]
+
+    def clear(self):
+        self._texts.clear()
+        self._grams.clear()
+
+    def query(self, pattern, cancelled=None):
+        """ Ids of the texts containing pattern, None if cancelled() turned true on the way. """
+        pattern = pattern.casefold()
+        texts = self._texts
+        if len(pattern) < 3:
+            candidates = texts
+        else:
+            sets = sorted((self._grams.get(gram, ()) for gram in trigrams(pattern)), key=len)
+            candidates = sets[0]
+            for ids in sets[1:]:
+                # Checking a handful of texts is cheaper than another intersection
+                if len(candidates) < 64:
+                    break
+                candidates = candidates & ids
+                if cancelled and cancelled():
+                    return None
+
+        found = set()
+        for i, id in enumerate(candidates):
+            if pattern in texts[id]:
+                found.add(id)
+            if not i % self.CHECK_EVERY and cancelled and cancelled():
+                return None
+        return found
+
+
+class SearchFilter(QObject):
+    """ Type-to-filter for the editable lists and trees.
+
+    The texts of the view's model are mirrored by its shared ModelMirror,
+    kept up to date from the model signals, and the changes are handed to a worker
+    thread which owns a TrigramIndex of them. Queries run on that thread
+    too, a new pattern cancels the one still running. The mirror is only
+    read and changed on the GUI thread, which resolves the ancestors of
+    the matches and drops results asked for before the last change. Rows
+    matching the pattern, and in trees their ancestors, stay visible, the
+    others are hidden a frame's worth at a time. `finished` gives the
+    number of matching texts once all rows are shown or hidden.
+
+    Texts in pending subtrees of lazily populated trees are searched as
+    well and keep their unexpanded ancestor visible.
+
+    >>> search = SearchFilter(tree)
+    >>> line_edit.textChanged.connect(search.setPattern)
+
+    """
+    finished = Signal(int)
+
+    def __init__(self, view, pending=None):
+        super().__init__(view)
+        self.view = view
+        self.model = model = view.model()
+        self._mirror = ModelMirror.forView(view, pending)
+        self._tree = isinstance(view, QTreeView)
+
+        self._pattern = ""
+        self._hidden = set()
+        self._matches = 0
+        self._waiting = False
+        self._building = False
+        self._feed = ChunkedFeed(self._hide, lambda: self.finished.emit(self._matches))
+
+        # Shared with the worker, only through atomic deque and tuple operations
+        self._ops = deque()
+        self._request = (0, "")
+        self._stale = 0
+        self._results = deque()
+        self._wake = threading.Event()
+        self._closed = False
+        self._worker = None
+
+        self._mirror.listen(self._notify)
+        view.destroyed.connect(self.close)
+
+    def pattern(self):
+        return self._pattern
+
+    def setPattern(self, pattern):
+        self._pattern = pattern
+        if pattern:
+            self._query()
+            return
+
+        # Nothing to search for, every hidden row comes back
+        self._request = (self._request[0] + 1, "")
+        self._waiting = False
+        animation_driver().unsubscribe(self)
+        self._apply(None, 0)
+
+    def isBusy(self):
+        return self._waiting or self._feed.isActive()
+
+    def close(self):
+        self._closed = True
+        self._waiting = False
+        self._wake.set()
+        self._mirror.unlisten(self._notify)
+        try:
+            self._feed.stop()
+            animation_driver().unsubscribe(self)
+        except RuntimeError:
+            # Closed on shutdown, after the frame clock went away
+            pass
+
+    def _query(self):
+        if self._mirror.store is None:
+            self._building = True
+            try:
+                self._mirror.build()
+            finally:
+                self._building = False
+        self._request = (self._request[0] + 1, self._pattern)
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work, daemon=True)
+            self._worker.start()
+        self._wake.set()
+        self._waiting = True
+        animation_driver().subscribe(self, self._drain)
+
+    def _work(self):
+        index = TrigramIndex()
+        owned, owner = {}, {}
+        synthetic = count(-1, -1)
+        served = 0
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._closed:
+                return
+
+            # Every op queued before this request was made is in the deque by now
+            generation, pattern = self._request
+            while self._ops:
+                op = self._ops.popleft()
+                kind = op[0]
+                if kind in ("add", "rename"):
+                    for id, text in zip(op[1], op[2]):
+                        index.add(id, text)
+                elif kind == "remove":
+                    for id in op[1]:
+                        index.remove(id)
+                        for sid in owned.pop(id, ()):
+                            index.remove(sid)
+                            del owner[sid]
+                elif kind == "pending":
+                    # Texts below a node which isn't expanded yet are found through it
+                    id, sids, stack = op[1], [], [op[2]]
+                    while stack:
+                        for text, children in stack.pop().items():
+                            sid = next(synthetic)
+                            index.add(sid, text)
+                            owner[sid] = id
+                            sids.append(sid)
+                            if isinstance(children, dict) and children:
+                                stack.append(children)
+                    owned.setdefault(id, []).extend(sids)
+                elif kind == "unpending":
+                    for sid in owned.pop(op[1], ()):
+                        index.remove(sid)
+                        del owner[sid]
+                elif kind == "clear":
+                    index.clear()
+                    owned.clear()
+                    owner.clear()
+
+            if generation == served or not pattern:
+                continue
+            served = generation
+
+            found = index.query(pattern, lambda: self._request[0] != generation or self._closed)
+            if found is not None:
+                self._results.append((generation, {owner.get(id, id) for id in found}, len(found)))
+
+    def _drain(self):
+        while self._results:
+            generation, found, matches = self._results.popleft()
+            # Ids in results from before the last change may have been reused since
+            if generation == self._request[0] and generation > self._stale:
+                self._waiting = False
+                animation_driver().unsubscribe(self)
+                self._apply(found, matches)
+
+    def _apply(self, found, matches):
+        self._feed.stop()
+        self._matches = matches
+        self._feed.extend(self._decisions(found))
+
+    def _decisions(self, found):
+        """ (parent, row, hide, id) for every row whose visibility has to change. """
+        store, hidden = self._mirror.store, self._hidden
+        if found is None:
+            for id in list(hidden):
+                yield self._mirror.index(store.parent[id]), store.row[id], False, id
+            return
+
+        # Ancestors of matches stay visible too
+        parents, visible = store.parent, set()
+        for id in found:
+            while id > 0 and id not in visible:
+                visible.add(id)
+                id = parents[id]
+
+        model = self.model
+        stack = [(0, QModelIndex())]
+        while stack:
+            id, parent = stack.pop()
+            for row, child in enumerate(store.children[id] or ()):
+                hide = child not in visible
+                if hide != (child in hidden):
+                    yield parent, row, hide, child
+                if not hide and store.children[child]:
+                    stack.append((child, model.index(row, 0, parent)))
+
+    def _hide(self, decisions):
+        view, hidden = self.view, self._hidden
+        for parent, row, hide, id in decisions:
+            if self._tree:
+                view.setRowHidden(row, parent, hide)
+            else:
+                view.setRowHidden(row, hide)
+            if hide:
+                hidden.add(id)
+            else:
+                hidden.discard(id)
+
+    def _notify(self, op):
+        kind = op[0]
+        self._stale = self._request[0]
+        if kind == "reset":
+            self._hidden.clear()
+        elif kind == "remove":
+            self._hidden.difference_update(op[1])
+        if kind not in ("move", "reset"):
+            self._ops.append(op)
+        if not self._building:
+            self._refresh(kind != "rename")
+
+    def _refresh(self, structure):
+        if self._closed:
+            return
+        try:
+            # Rows the running pass would show or hide may have moved
+            if structure:
+                self._feed.stop()
+            if self._pattern:
+                self._waiting = True
+                animation_driver().schedule(self, self._query)
+            elif self._ops:
+                self._wake.set()
+        except RuntimeError:
+            # Rows removed on shutdown, after the frame clock went away
+            self.close()
+
+
+if __name__ == "__main__":
+    from PySide2.QtWidgets import QApplication, QLineEdit
+    from dqtwidgets.layouts import v_layout
+    from dqtwidgets.editable import EditableTree, add_action
+    import sys
+    app = QApplication([])
+
+    tree = EditableTree({f"group {i}": {f"channel {i}.{j}": {} for j in range(100)} for i in range(2000)})
+    add_action(tree, "add entry", lambda tree: tree.add_entry())
+    search = SearchFilter(tree)
+    search.finished.connect(lambda n: print(f"{n} matches"))
+
+    line = QLineEdit()
+    line.setPlaceholderText("filter")
+    line.textChanged.connect(search.setPattern)
+
+    window = v_layout([line, tree])
+    window.show()
+
+    sys.exit(app.exec_())
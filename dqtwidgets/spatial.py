@@ -0,0 +1,388 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+from collections import deque
+from math import floor, sqrt
+import numpy as np
+
+
+NO_POINTS = np.zeros((0, 2))
+
+
+class GridIndex:
+    """ Uniform grid over 2D points.
+
+    Every cell holds the set of point ids falling into it, so inserting,
+    removing and moving a point only touches one or two cells. Rectangle
+    queries visit the cells overlapping the rectangle instead of all points.
+
+    >>> index = GridIndex(cell_size=0.5)
+    >>> index.insert(7, 1.2, 3.4)
+    >>> index.query(1, 3, 2, 4)
+    >>> [7]
+
+    """
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self._cells = {}
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _key(self, x, y):
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def insert(self, id, x, y):
+        key = self._key(x, y)
+        self._keys[id] = key
+        self._cells.setdefault(key, set()).add(id)
+
+    def build(self, ids, xy):
+        """ Insert many points at once, xy is an (N, 2) array. """
+        cells = np.floor(np.asarray(xy, dtype=float) / self.cell_size).astype(np.int64)
+        for id, i, j in zip(np.asarray(ids).tolist(), cells[:, 0].tolist(), cells[:, 1].tolist()):
+            key = (i, j)
+            self._keys[id] = key
+            cell = self._cells.get(key)
+            if cell is None:
+                self._cells[key] = {id}
+            else:
+                cell.add(id)
+
+    def remove(self, id):
+        key = self._keys.pop(id, None)
+        if key is None:
+            return
+        cell = self._cells[key]
+        cell.discard(id)
+        if not cell:
+            del self._cells[key]
+
+    def move(self, id, x, y):
+        key = self._key(x, y)
+        if self._keys.get(id) == key:
+            return
+        self.remove(id)
+        self._keys[id] = key
+        self._cells.setdefault(key, set()).add(id)
+
+    def clear(self):
+        self._cells.clear()
+        self._keys.clear()
+
+    def span(self, x0, y0, x1, y1):
+        """ Number of grid cells overlapping the rectangle, empty or not. """
+        i0, j0 = self._key(min(x0, x1), min(y0, y1))
+        i1, j1 = self._key(max(x0, x1), max(y0, y1))
+        return (i1 - i0 + 1) * (j1 - j0 + 1)
+
+    def occupied(self):
+        return len(self._cells)
+
+    def query(self, x0, y0, x1, y1):
+        """ Ids in the cells overlapping the rectangle, a superset of the points inside it. """
+        i0, j0 = self._key(min(x0, x1), min(y0, y1))
+        i1, j1 = self._key(max(x0, x1), max(y0, y1))
+
+        # A large rectangle over a sparse grid is cheaper to scan by cell
+        if self.span(x0, y0, x1, y1) > len(self._cells):
+            return [id for (i, j), cell in self._cells.items()
+                    if i0 <= i <= i1 and j0 <= j <= j1 for id in cell]
+
+        ids = []
+        cells = self._cells
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = cells.get((i, j))
+                if cell:
+                    ids.extend(cell)
+        return ids
+
+
+class PointSet:
+    """ Array backed set of 2D target positions with a grid index.
+
+    Positions live in one growable (capacity, 2) array. Ids returned by add()
+    and extend() stay valid until the point is removed, moving or removing a
+    point updates the index in place. The grid is only rebuilt when the
+    number of points has grown enough to make its cells too crowded.
+
+    The positions removed and added by the last LOG changes are kept, so
+    derived data like a DensityPyramid can follow the points through
+    changes_since() instead of starting over.
+
+    >>> wells = PointSet(np.random.uniform(-5, 5, (5000, 2)))
+    >>> wells.pick(1.0, 2.0, 0.1, 0.1)
+    >>> 1742
+
+    """
+    LOG = 1024
+    LOG_POINTS = 4096
+
+    def __init__(self, points=(), cell_size=None):
+        self._xy = np.zeros((16, 2))
+        self._alive = np.zeros(16, dtype=bool)
+        self._end = 0
+        self._count = 0
+        self._fixed_cell = cell_size
+        self._index = GridIndex(cell_size or 1.0)
+        self._indexed = 0
+        self._log = deque(maxlen=self.LOG)
+        self.version = 0
+
+        if len(points):
+            self.extend(points)
+
+    def __len__(self):
+        return self._count
+
+    def _reserve(self, n):
+        if self._end + n <= len(self._xy):
+            return
+        capacity = max(2 * len(self._xy), self._end + n)
+        xy = np.zeros((capacity, 2))
+        xy[:self._end] = self._xy[:self._end]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._end] = self._alive[:self._end]
+        self._xy, self._alive = xy, alive
+
+    def add(self, x, y):
+        self._reserve(1)
+        id = self._end
+        self._xy[id] = x, y
+        self._alive[id] = True
+        self._end += 1
+        self._count += 1
+        if not self._reindex():
+            self._index.insert(id, x, y)
+        self._changed(NO_POINTS, self._xy[id:id + 1].copy())
+        return id
+
+    def extend(self, points):
+        """ Add an (N, 2) or (N, 3) array of points, returns their ids. """
+        xy = np.asarray(points, dtype=float).reshape(len(points), -1)[:, :2]
+        n = len(xy)
+        self._reserve(n)
+        ids = np.arange(self._end, self._end + n)
+        self._xy[ids] = xy
+        self._alive[ids] = True
+        self._end += n
+        self._count += n
+        if not self._reindex():
+            self._index.build(ids, xy)
+        if n <= self.LOG_POINTS:
+            self._changed(NO_POINTS, xy.copy())
+        else:
+            self._changed(None, None)
+        return ids
+
+    def move(self, id, x, y):
+        if not self._alive[id]:
+            return
+        before = self._xy[id:id + 1].copy()
+        self._xy[id] = x, y
+        self._index.move(id, x, y)
+        self._changed(before, self._xy[id:id + 1].copy())
+
+    def remove(self, id):
+        if not self._alive[id]:
+            return
+        self._alive[id] = False
+        self._count -= 1
+        self._index.remove(id)
+        self._changed(self._xy[id:id + 1].copy(), NO_POINTS)
+
+    def clear(self):
+        self._alive[:] = False
+        self._end = 0
+        self._count = 0
+        self._index.clear()
+        self._indexed = 0
+        self._changed(None, None)
+
+    def _changed(self, removed, added):
+        self._log.append(None if removed is None else (removed, added))
+        self.version += 1
+
+    def changes_since(self, version):
+        """ Positions (removed, added) by the changes after version, None if they weren't all kept. """
+        n = self.version - version
+        if n < 0 or n > len(self._log):
+            return None
+        changes = list(self._log)[len(self._log) - n:] if n else []
+        if None in changes:
+            return None
+        if not changes:
+            return NO_POINTS, NO_POINTS
+        removed, added = zip(*changes)
+        return np.concatenate(removed), np.concatenate(added)
+
+    def position(self, id):
+        x, y = self._xy[id].tolist()
+        return x, y
+
+    def positions(self, ids=None):
+        """ Ids and (N, 2) positions of the given or of all live points. """
+        if ids is None:
+            ids = np.flatnonzero(self._alive[:self._end])
+        return ids, self._xy[ids]
+
+    def bounds(self):
+        """ (x0, y0, x1, y1) of the live points, None when empty. """
+        if not self._count:
+            return None
+        xy = self._xy[:self._end][self._alive[:self._end]]
+        (x0, y0), (x1, y1) = xy.min(axis=0).tolist(), xy.max(axis=0).tolist()
+        return x0, y0, x1, y1
+
+    def inside(self, x0, y0, x1, y1):
+        """ Ids of the points within a rectangle. """
+        index = self._index
+        if 4 * index.span(x0, y0, x1, y1) > index.occupied():
+            # Collecting the ids of a good part of the cells costs more than masking every position
+            xy = self._xy[:self._end]
+            keep = (self._alive[:self._end] &
+                    (xy[:, 0] >= min(x0, x1)) & (xy[:, 0] <= max(x0, x1)) &
+                    (xy[:, 1] >= min(y0, y1)) & (xy[:, 1] <= max(y0, y1)))
+            return np.flatnonzero(keep)
+
+        ids = np.fromiter(index.query(x0, y0, x1, y1), dtype=np.int64)
+        xy = self._xy[ids]
+        keep = ((xy[:, 0] >= min(x0, x1)) & (xy[:, 0] <= max(x0, x1)) &
+                (xy[:, 1] >= min(y0, y1)) & (xy[:, 1] <= max(y0, y1)))
+        return ids[keep]
+
+    def pick(self, x, y, rx, ry=None):
+        """ Id of the point nearest to (x, y) within the ellipse of radii rx, ry, -1 if none.
+
+        Separate radii allow picking with a fixed radius in pixels on a view
+        which scales the axes differently.
+
+        """
+        ry = rx if ry is None else ry
+        ids = np.fromiter(self._index.query(x - rx, y - ry, x + rx, y + ry), dtype=np.int64)
+        if not len(ids):
+            return -1
+
+        d = (self._xy[ids] - (x, y)) / (rx, ry)
+        d = np.einsum("ij,ij->i", d, d)
+        best = int(d.argmin())
+        return int(ids[best]) if d[best] <= 1 else -1
+
+    def _reindex(self):
+        """ Rebuild the grid with a finer cell once the point count has grown fourfold. """
+        if self._fixed_cell or self._count < 4 * max(self._indexed, 16):
+            return False
+
+        # Aim for a few points per cell over the area covered by the points
+        x0, y0, x1, y1 = self.bounds()
+        area = max((x1 - x0) * (y1 - y0), 1e-12)
+        self._index = GridIndex(2 * sqrt(area / self._count) or 1.0)
+        self._index.build(*self.positions())
+        self._indexed = self._count
+        return True
+
+
+class DensityPyramid:
+    """ Point counts on a grid over a fixed extent, coarser by half per level.
+
+    Level 0 has `resolution` cells along each axis, every following level
+    sums 2x2 cells of the previous one. Drawing the non-empty cells of a
+    level whose cells are about a pixel wide shows the distribution of any
+    number of points at a cost bounded by the number of pixels. update()
+    moves the counts of changed points through all levels.
+
+    >>> pyramid = DensityPyramid((-5, -5, 5, 5), points.positions()[1])
+    >>> centers, counts = pyramid.cells(3, -1, -1, 1, 1)
+
+    """
+    def __init__(self, extent, xy, resolution=1024):
+        x0, y0, x1, y1 = extent
+        self.extent = extent
+        self.resolution = resolution
+        self._size = ((x1 - x0) or 1.0, (y1 - y0) or 1.0)
+
+        ij, keep = self._ij(xy)
+        counts = np.bincount(ij[keep, 1] * resolution + ij[keep, 0], minlength=resolution * resolution)
+
+        self.levels = [counts.astype(np.int32).reshape(resolution, resolution)]
+        while len(self.levels[-1]) > 1:
+            n = len(self.levels[-1]) // 2
+            self.levels.append(self.levels[-1].reshape(n, 2, n, 2).sum(axis=(1, 3)))
+
+    def _ij(self, xy):
+        """ Level 0 cells of positions and whether they fall within the extent. """
+        ij = np.floor((np.asarray(xy, dtype=float) - self.extent[:2]) / self._size * self.resolution)
+        ij = ij.astype(np.int64)
+        return ij, np.all((ij >= 0) & (ij < self.resolution), axis=1)
+
+    def update(self, removed, added):
+        """ Count points moved from the removed to the added positions, False if one is outside the extent. """
+        removed, inside = self._ij(removed)
+        added, keep = self._ij(added)
+        if not keep.all():
+            return False
+        removed = removed[inside]
+        for level, counts in enumerate(self.levels):
+            np.subtract.at(counts, (removed[:, 1] >> level, removed[:, 0] >> level), 1)
+            np.add.at(counts, (added[:, 1] >> level, added[:, 0] >> level), 1)
+        return True
+
+    def cell_size(self, level):
+        n = self.resolution >> level
+        return self._size[0] / n, self._size[1] / n
+
+    def level_for(self, sx, sy, pixels=1.0):
+        """ Finest level with cells at least `pixels` wide at sx, sy pixels per unit.
+
+        Returns -1 when even level 0 cells are larger, then the points
+        themselves are cheap enough to draw.
+
+        """
+        for level in range(len(self.levels)):
+            w, h = self.cell_size(level)
+            if w * abs(sx) >= pixels and h * abs(sy) >= pixels:
+                return level if level else -1
+        return len(self.levels) - 1
+
+    def cells(self, level, x0, y0, x1, y1):
+        """ Centers and counts of the non-empty cells of a level overlapping a rectangle. """
+        counts = self.levels[level]
+        n = len(counts)
+        w, h = self.cell_size(level)
+        ex, ey = self.extent[:2]
+
+        i0 = max(int((min(x0, x1) - ex) // w), 0)
+        i1 = min(int((max(x0, x1) - ex) // w) + 1, n)
+        j0 = max(int((min(y0, y1) - ey) // h), 0)
+        j1 = min(int((max(y0, y1) - ey) // h) + 1, n)
+        if i0 >= i1 or j0 >= j1:
+            return np.zeros((0, 2)), np.zeros(0, dtype=np.int32)
+
+        window = counts[j0:j1, i0:i1]
+        j, i = np.nonzero(window)
+        centers = np.column_stack((ex + (i + i0 + 0.5) * w, ey + (j + j0 + 0.5) * h))
+        return centers, window[j, i]
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+
+    points = PointSet(np.random.uniform(-5, 5, (100_000, 2)))
+    start = perf_counter()
+    for x in np.linspace(-5, 5, 1000):
+        points.pick(x, x, 0.05)
+    print(f"pick: {(perf_counter() - start) * 1e3:.3f} us per query")
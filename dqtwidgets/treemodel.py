@@ -0,0 +1,441 @@
+# Copyright 2021 Dmitry Kouznetsov <dmitry.kouznetsov@protonmail.com>
+#
+# This program is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see http://www.gnu.org/licenses/.
+#
+from array import array
+from itertools import repeat
+from PySide2.QtWidgets import QTreeView, QAbstractItemView
+from PySide2.QtCore import Qt, QObject, QAbstractItemModel, QModelIndex, QPersistentModelIndex
+from dqtwidgets.editable import (add_context_menu, enable_bidirectional_drag, ItemsCache, NODES_MIME, NodesMimeData,
+                                 dropped_nodes, normalized_nodes)
+
+
+class NodeStore:
+    """ Tree of texts kept in flat per node arrays.
+
+    A node is an id into the arrays holding its text, parent and row. Node 0
+    is the invisible root. Only nodes with children own a list of child ids,
+    leaves store None, and children which haven't been created yet are kept
+    as the nested dict they came from in `pending`. Ids of removed nodes are
+    reused.
+
+    >>> store = NodeStore()
+    >>> store.insert(0, 0, ["stage", "camera"])
+    >>> [1, 2]
+
+    """
+    def __init__(self):
+        self.text = [None]
+        self.parent = array("l", [-1])
+        self.row = array("l", [0])
+        self.children = [[]]
+        self.pending = {}
+        self._free = []
+
+    def __len__(self):
+        return len(self.text) - len(self._free) - 1
+
+    def copy(self):
+        store = NodeStore()
+        store.text = list(self.text)
+        store.parent = array("l", self.parent)
+        store.row = array("l", self.row)
+        store.children = [None if kids is None else list(kids) for kids in self.children]
+        store.pending = dict(self.pending)
+        store._free = list(self._free)
+        return store
+
+    def insert(self, parent, row, texts, pending=(), copy=True):
+        """ Insert nodes before `row` of parent, returns their ids.
+
+        `pending` optionally gives the nested dict of children of each new
+        node, which is only unpacked by fetch(). They are kept as
+        normalized_nodes() copies, unless `copy` is False for dicts which
+        already are one.
+
+        """
+        texts = list(texts)
+        n = len(texts)
+        reuse = min(n, len(self._free))
+        ids = [self._free.pop() for _ in range(reuse)]
+        for id, text in zip(ids, texts):
+            self.text[id] = text
+            self.parent[id] = parent
+            self.children[id] = None
+
+        # Fresh ids are appended in bulk
+        start = len(self.text)
+        self.text.extend(texts[reuse:])
+        self.parent.extend(repeat(parent, n - reuse))
+        self.row.extend(repeat(0, n - reuse))
+        self.children.extend(repeat(None, n - reuse))
+        ids.extend(range(start, start + n - reuse))
+
+        for id, children in zip(ids, pending):
+            children = normalized_nodes(children) if copy else children
+            if children:
+                self.pending[id] = children
+
+        kids = self.children[parent]
+        if kids is None:
+            kids = self.children[parent] = []
+        kids[row:row] = ids
+        self._renumber(parent, row)
+        return ids
+
+    def populate(self, parent, nodes):
+        """ Append the first level of a nested dict below parent. """
+        return self.insert(parent, self.rowCount(parent), map(str, nodes), nodes.values())
+
+    def fetch(self, id):
+        """ Create the pending children of a node, returns how many there are. """
+        nodes = self.pending.pop(id, None)
+        if nodes:
+            self.insert(id, self.rowCount(id), nodes, nodes.values(), copy=False)
+        return len(nodes or ())
+
+    def remove(self, parent, row, count):
+        kids = self.children[parent]
+        removed = kids[row:row + count]
+        del kids[row:row + count]
+        self._renumber(parent, row)
+
+        stack = removed
+        while stack:
+            id = stack.pop()
+            if self.children[id]:
+                stack.extend(self.children[id])
+            self.pending.pop(id, None)
+            self.text[id] = None
+            self.children[id] = None
+            self.parent[id] = -1
+            self._free.append(id)
+
+    def move(self, parent, row, count, destination, before):
+        """ Move rows to another parent or position, `before` counts rows before the move. """
+        kids = self.children[parent]
+        moved = kids[row:row + count]
+        del kids[row:row + count]
+        if destination == parent and before > row:
+            before -= count
+        self._renumber(parent, row)
+
+        targets = self.children[destination]
+        if targets is None:
+            targets = self.children[destination] = []
+        targets[before:before] = moved
+        for id in moved:
+            self.parent[id] = destination
+        self._renumber(destination, min(before, row) if destination == parent else before)
+
+    def isAncestor(self, ancestor, id):
+        while id > 0:
+            if id == ancestor:
+                return True
+            id = self.parent[id]
+        return ancestor == 0
+
+    def rowCount(self, id):
+        kids = self.children[id]
+        return len(kids) if kids else 0
+
+    def _renumber(self, parent, start):
+        kids = self.children[parent]
+        rows = self.row
+        for r in range(start, len(kids)):
+            rows[kids[r]] = r
+
+    def to_dict(self, id=0, node=dict):
+        """ Same nested dicts as model_to_dict(), straight from the arrays. """
+        root = node()
+        stack = [(id, root)]
+        text, children, pending = self.text, self.children, self.pending
+        while stack:
+            id, d = stack.pop()
+            rows = getattr(d, "rows", None)
+            fresh = []
+            for child in children[id] or ():
+                t = text[child]
+                v = pending.get(child)
+                if v is None:
+                    v = node()
+                    if children[child]:
+                        fresh.append((child, t, v))
+                d[t] = v
+                if rows is not None:
+                    rows.append(t)
+
+            # Shadowed duplicates never show up in the result
+            stack.extend((child, v) for child, t, v in fresh if d[t] is v)
+        return root
+
+    def nodes(self, ids):
+        """ (text, children) of every node, as encode_nodes() takes them. Pending dicts are shared. """
+        pending = self.pending
+        return [(self.text[id], pending[id] if id in pending else self.to_dict(id)) for id in ids]
+
+
+class TreeModel(QAbstractItemModel):
+    """ Single column item model over a NodeStore.
+
+    Indexes carry the node id as their internal id, so parent() and
+    index() are array lookups. Nested dicts passed to populate() are
+    unpacked one level at a time through canFetchMore()/fetchMore().
+
+    """
+    def __init__(self, nodes={}, parent=None):
+        super().__init__(parent)
+        self.store = NodeStore()
+        self.populate(nodes)
+
+    def populate(self, nodes, parent=QModelIndex()):
+        if not nodes:
+            return
+        id = self.nodeId(parent)
+        first = self.store.rowCount(id)
+        self.beginInsertRows(parent, first, first + len(nodes) - 1)
+        self.store.populate(id, nodes)
+        self.endInsertRows()
+
+    def nodeId(self, index):
+        return index.internalId() if index.isValid() else 0
+
+    def pendingChildren(self, index):
+        return self.store.pending.get(self.nodeId(index))
+
+    def subtreeToDict(self, index, node=dict, pending=None):
+        return self.store.to_dict(self.nodeId(index), node)
+
+    def index(self, row, column, parent=QModelIndex()):
+        kids = self.store.children[self.nodeId(parent)]
+        if column != 0 or not kids or not 0 <= row < len(kids):
+            return QModelIndex()
+        return self.createIndex(row, 0, kids[row])
+
+    def parent(self, index=None):
+        if index is None:
+            return QObject.parent(self)
+        if not index.isValid():
+            return QModelIndex()
+        parent = self.store.parent[index.internalId()]
+        if parent <= 0:
+            return QModelIndex()
+        return self.createIndex(self.store.row[parent], 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return self.store.rowCount(self.nodeId(parent))
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        id = self.nodeId(parent)
+        return bool(self.store.children[id]) or id in self.store.pending
+
+    def canFetchMore(self, parent):
+        return self.nodeId(parent) in self.store.pending
+
+    def fetchMore(self, parent):
+        id = self.nodeId(parent)
+        nodes = self.store.pending.get(id)
+        if nodes:
+            first = self.store.rowCount(id)
+            self.beginInsertRows(parent, first, first + len(nodes) - 1)
+            self.store.fetch(id)
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+            return self.store.text[index.internalId()]
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return False
+        self.store.text[index.internalId()] = value
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        return (Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable |
+                Qt.ItemIsDragEnabled | Qt.ItemIsDropEnabled)
+
+    def supportedDropActions(self):
+        return Qt.MoveAction | Qt.CopyAction
+
+    def topmost(self, indexes):
+        """ Indexes without an ancestor among them, in tree order. """
+        selected = {self.nodeId(index): index for index in indexes}
+        parent, row = self.store.parent, self.store.row
+        paths = []
+        for id, index in selected.items():
+            path = []
+            while id > 0:
+                path.append(row[id])
+                id = parent[id]
+                if id in selected:
+                    break
+            else:
+                paths.append((path[::-1], index))
+        paths.sort(key=lambda pair: pair[0])
+        return [index for _, index in paths]
+
+    def mimeTypes(self):
+        return [NODES_MIME] + super().mimeTypes()
+
+    def mimeData(self, indexes):
+        """ The topmost dragged nodes with their subtrees, pending ones are passed on unexpanded. """
+        indexes = self.topmost([index for index in indexes if index.column() == 0])
+        return NodesMimeData(self.store.nodes([self.nodeId(index) for index in indexes]))
+
+    def dropMimeData(self, data, action, row, column, parent):
+        nodes = dropped_nodes(data)
+        if nodes is None:
+            return super().dropMimeData(data, action, row, column, parent)
+        if action == Qt.IgnoreAction:
+            return True
+        if not nodes:
+            return False
+
+        # One insertion for the whole drop, the subtrees stay pending
+        self.fetchMore(parent)
+        id = self.nodeId(parent)
+        if row < 0:
+            row = self.store.rowCount(id)
+        self.beginInsertRows(parent, row, row + len(nodes) - 1)
+        self.store.insert(id, row, [text for text, _ in nodes], [children for _, children in nodes])
+        self.endInsertRows()
+        return True
+
+    def insertRows(self, row, count, parent=QModelIndex()):
+        # Rows go next to the existing children, so those have to exist first
+        self.fetchMore(parent)
+        self.beginInsertRows(parent, row, row + count - 1)
+        self.store.insert(self.nodeId(parent), row, [""] * count)
+        self.endInsertRows()
+        return True
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if count <= 0 or row + count > self.rowCount(parent):
+            return False
+        self.beginRemoveRows(parent, row, row + count - 1)
+        self.store.remove(self.nodeId(parent), row, count)
+        self.endRemoveRows()
+        return True
+
+    def moveRows(self, source, row, count, destination, before):
+        destination_id = self.nodeId(destination)
+        source_id = self.nodeId(source)
+        kids = self.store.children[source_id] or ()
+        if any(self.store.isAncestor(id, destination_id) for id in kids[row:row + count]):
+            return False
+        self.fetchMore(destination)
+        if not self.beginMoveRows(source, row, row + count - 1, destination, before):
+            return False
+        self.store.move(source_id, row, count, destination_id, before)
+        self.endMoveRows()
+        return True
+
+
+class EditableTreeView(QTreeView):
+    """ EditableTree on a TreeModel, for trees with millions of nodes.
+
+    Same context menu, in place editing and drag and drop as EditableTree,
+    but nodes live in a NodeStore instead of one QTreeWidgetItem each.
+    Moving rows inside the view keeps their children.
+
+    >>> tree = EditableTreeView({"stage": {"x": {}, "y": {}}})
+    >>> add_action(tree, "print items dict", lambda tree: print(tree.items))
+
+    """
+    def __init__(self, nodes={}, actions={}):
+        super().__init__()
+        add_context_menu(self)
+        self.setHeaderHidden(True)
+        self.setAlternatingRowColors(True)
+        self.setUniformRowHeights(True)
+        self.setModel(TreeModel(nodes, self))
+
+        # Drag'n'drop between e.g. list and tree
+        enable_bidirectional_drag(self)
+
+        self.doubleClicked.connect(self.edit_item)
+        model = self.model()
+        self._items = ItemsCache(model, model.pendingChildren, model.subtreeToDict)
+
+    def add_entry(self):
+        model = self.model()
+        model.insertRows(0, 1)
+        model.setData(model.index(0, 0), "NEW ENTRY")
+
+    @property
+    def items(self):
+        """ Nested dict of the item texts.
+
+        Copied from a cache patched as the tree changes, the result is the
+        caller's to keep or change.
+
+        """
+        return self._items.copy()
+
+    def edit_item(self, index):
+        self.edit(index)
+
+    def dropEvent(self, event):
+        if event.source() is not self or event.dropAction() != Qt.MoveAction:
+            return QTreeView.dropEvent(self, event)
+
+        model = self.model()
+        target = self.indexAt(event.pos())
+        position = self.dropIndicatorPosition()
+        if position == QAbstractItemView.OnItem and target.isValid():
+            model.fetchMore(target)
+            parent, row = target, model.rowCount(target)
+        elif position in (QAbstractItemView.AboveItem, QAbstractItemView.BelowItem) and target.isValid():
+            parent = target.parent()
+            row = target.row() + (position == QAbstractItemView.BelowItem)
+        else:
+            parent, row = QModelIndex(), model.rowCount()
+
+        # Only the topmost selected rows move, their children go with them
+        moving = [QPersistentModelIndex(index) for index in model.topmost(self.selectedIndexes())]
+
+        parent = QPersistentModelIndex(parent)
+        anchor = QPersistentModelIndex(model.index(row, 0, parent)) if row < model.rowCount(parent) else None
+        for index in moving:
+            before = anchor.row() if anchor is not None and anchor.isValid() else model.rowCount(parent)
+            model.moveRows(index.parent(), index.row(), 1, parent, before)
+
+        # Keep the view from removing the source rows once more
+        event.setDropAction(Qt.CopyAction)
+        event.accept()
+
+
+if __name__ == "__main__":
+    from PySide2.QtWidgets import QApplication
+    from dqtwidgets.editable import add_action
+    import sys
+    app = QApplication([])
+
+    nodes = {f"group {i}": {f"channel {j}": {} for j in range(1000)} for i in range(1000)}
+    tree = EditableTreeView(nodes)
+    add_action(tree, "print items dict", lambda tree: print(len(tree.items)))
+    add_action(tree, "add entry", lambda tree: tree.add_entry())
+    tree.show()
+
+    sys.exit(app.exec_())
@@ -8,5 +8,5 @@ setup(
     author="Dmitry Kouznetsov",
     license="GPLv3",
     packages=["dqtwidgets"],
-    install_requires=["PySide2"],
+    install_requires=["PySide2", "numpy"],
     zip_safe=True)